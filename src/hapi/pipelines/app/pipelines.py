@@ -1,13 +1,33 @@
 import logging
 from datetime import datetime
-from typing import Dict, Optional
+from functools import partial
+from threading import RLock
+from typing import Callable, Dict, Optional, Set, Tuple
 
+from hapi_schema.db_conflict_event import DBConflictEvent
+from hapi_schema.db_currency import DBCurrency
+from hapi_schema.db_food_price import DBFoodPrice
+from hapi_schema.db_food_security import DBFoodSecurity
+from hapi_schema.db_funding import DBFunding
+from hapi_schema.db_humanitarian_needs import DBHumanitarianNeeds
+from hapi_schema.db_idps import DBIDPs
+from hapi_schema.db_national_risk import DBNationalRisk
+from hapi_schema.db_operational_presence import DBOperationalPresence
+from hapi_schema.db_org import DBOrg
+from hapi_schema.db_org_type import DBOrgType
+from hapi_schema.db_population import DBPopulation
+from hapi_schema.db_poverty_rate import DBPovertyRate
+from hapi_schema.db_rainfall import DBRainfall
+from hapi_schema.db_refugees import DBRefugees
+from hapi_schema.db_returnees import DBReturnees
+from hapi_schema.db_sector import DBSector
+from hapi_schema.db_wfp_commodity import DBWFPCommodity
+from hapi_schema.db_wfp_market import DBWFPMarket
 from hdx.api.configuration import Configuration
 from hdx.api.utilities.hdx_error_handler import HDXErrorHandler
 from hdx.database import Database
 from hdx.location.adminlevel import AdminLevel
 from hdx.scraper.framework.runner import Runner
-from hdx.scraper.framework.utilities.reader import Read
 from hdx.scraper.framework.utilities.sources import Sources
 from hdx.utilities.typehint import ListTuple
 
@@ -31,11 +51,78 @@ from hapi.pipelines.database.rainfall import Rainfall
 from hapi.pipelines.database.refugees import Refugees
 from hapi.pipelines.database.returnees import Returnees
 from hapi.pipelines.database.sector import Sector
+from hapi.pipelines.database.source_manifest import MANIFEST_ENTRIES, SourceManifest
 from hapi.pipelines.database.wfp_commodity import WFPCommodity
 from hapi.pipelines.database.wfp_market import WFPMarket
+from hapi.pipelines.utilities.admin_cache import (
+    get_admin_levels,
+    get_resource_versions,
+)
+from hapi.pipelines.utilities.reader import get_reader
+from hapi.pipelines.utilities.run_report import RunReport
+from hapi.pipelines.utilities.theme_scheduler import ThemeScheduler
 
 logger = logging.getLogger(__name__)
 
+# Optional components needed by each theme. Locations, admins, metadata, org
+# types and sectors are always output as a run that recreates the schema
+# would otherwise leave their tables empty, so the global p-codes are
+# downloaded whatever the themes unless existing admins are kept by an
+# incremental run.
+THEME_REQUIREMENTS = {
+    "population": ("admin_levels",),
+    "operational_presence": ("admin_levels",),
+    "food_security": ("admin_levels",),
+    "humanitarian_needs": ("admin_levels",),
+    "national_risk": ("national_risk_scrapers",),
+    "refugees": (),
+    "returnees": (),
+    "idps": ("admin_levels",),
+    "funding": (),
+    "poverty_rate": ("admin_levels",),
+    "conflict_event": ("admin_levels",),
+    "food_prices": ("admin_levels",),
+    "rainfall": ("admin_levels",),
+}
+
+# HAPI datasets read by each theme. Themes not listed here (national risk is
+# scraped) are always reloaded in incremental runs.
+THEME_DATASETS = {
+    "population": ("hdx-hapi-population",),
+    "operational_presence": (
+        "hdx-hapi-operational-presence",
+        "hdx-hapi-organisations",
+    ),
+    "food_security": ("hdx-hapi-food-security",),
+    "humanitarian_needs": ("hdx-hapi-humanitarian-needs",),
+    "refugees": ("hdx-hapi-refugees",),
+    "returnees": ("hdx-hapi-returnees",),
+    "idps": ("hdx-hapi-idps",),
+    "funding": ("hdx-hapi-funding",),
+    "poverty_rate": ("hdx-hapi-poverty-rate",),
+    "conflict_event": ("hdx-hapi-conflict-event",),
+    "food_prices": ("hdx-hapi-food-price",),
+    "rainfall": ("hdx-hapi-rainfall",),
+}
+
+# Tables written by each theme ordered so that those referencing others come
+# first
+THEME_TABLES = {
+    "population": (DBPopulation,),
+    "operational_presence": (DBOperationalPresence, DBOrg),
+    "food_security": (DBFoodSecurity,),
+    "humanitarian_needs": (DBHumanitarianNeeds,),
+    "national_risk": (DBNationalRisk,),
+    "refugees": (DBRefugees,),
+    "returnees": (DBReturnees,),
+    "idps": (DBIDPs,),
+    "funding": (DBFunding,),
+    "poverty_rate": (DBPovertyRate,),
+    "conflict_event": (DBConflictEvent,),
+    "food_prices": (DBFoodPrice, DBWFPMarket, DBWFPCommodity, DBCurrency),
+    "rainfall": (DBRainfall,),
+}
+
 
 class Pipelines:
     def __init__(
@@ -48,10 +135,23 @@ class Pipelines:
         error_handler: Optional[HDXErrorHandler] = None,
         use_live: bool = True,
         countries_to_run: Optional[ListTuple[str]] = None,
+        workers: Optional[int] = None,
+        run_report: Optional[RunReport] = None,
+        incremental: bool = False,
     ):
         self._configuration = configuration
         self._database = database
         self._themes_to_run = themes_to_run
+        if workers is None:
+            workers = configuration.get("theme_workers", 1)
+        self._workers = workers
+        if run_report is None:
+            run_report = RunReport()
+        self._run_report = run_report
+        self._incremental = incremental
+        self._manifest = None
+        if incremental:
+            self._manifest = SourceManifest(database, configuration)
         self._locations = Locations(
             configuration=configuration,
             database=database,
@@ -60,40 +160,18 @@ class Pipelines:
         )
         self._countries = self._locations.hapi_countries
         self._error_handler = error_handler
-        reader = Read.get_reader("hdx")
-        libhxl_dataset = AdminLevel.get_libhxl_dataset(retriever=reader).cache()
-        libhxl_format_dataset = AdminLevel.get_libhxl_dataset(
-            url=AdminLevel.formats_url, retriever=reader
-        ).cache()
+        self._requirements = self.get_requirements()
+        self._lock = RLock()
         self._admins = Admins(
             configuration,
             database,
             self._locations,
-            libhxl_dataset,
             error_handler,
         )
-        admin1_config = configuration["admin1"]
-        self._adminone = AdminLevel(admin_config=admin1_config, admin_level=1)
-        admin2_config = configuration["admin2"]
-        self._admintwo = AdminLevel(admin_config=admin2_config, admin_level=2)
-        self._adminone.setup_from_libhxl_dataset(libhxl_dataset)
-        self._adminone.load_pcode_formats_from_libhxl_dataset(libhxl_format_dataset)
-        self._admintwo.setup_from_libhxl_dataset(libhxl_dataset)
-        self._admintwo.load_pcode_formats_from_libhxl_dataset(libhxl_format_dataset)
-        self._admintwo.set_parent_admins_from_adminlevels([self._adminone])
-        logger.info("Admin one name mappings:")
-        self._adminone.output_admin_name_mappings()
-        logger.info("Admin two name mappings:")
-        self._admintwo.output_admin_name_mappings()
-        logger.info("Admin two name replacements:")
-        self._admintwo.output_admin_name_replacements()
+        self._admin_path = None
+        self._adminone = None
+        self._admintwo = None
 
-        self._org_type = OrgType(
-            database=database,
-        )
-        self._sector = Sector(
-            database=database,
-        )
         Sources.set_default_source_date_format("%Y-%m-%d")
         self._runner = Runner(
             self._countries,
@@ -159,212 +237,470 @@ class Pipelines:
             current_scrapers = self._configurable_scrapers.get(prefix, [])
             self._configurable_scrapers[prefix] = current_scrapers + scraper_names
 
-        _create_configurable_scrapers("national_risk", "national")
+        if "national_risk_scrapers" in self._requirements:
+            _create_configurable_scrapers("national_risk", "national")
 
     def run(self):
-        self._runner.run()
-
-    def output_population(self):
-        if not self._themes_to_run or "population" in self._themes_to_run:
-            population = Population(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            population.populate()
-
-    def output_operational_presence(self):
-        if not self._themes_to_run or "operational_presence" in self._themes_to_run:
-            org = Org(
-                database=self._database,
-                metadata=self._metadata,
-                configuration=self._configuration,
-            )
-            org.populate()
-            operational_presence = OperationalPresence(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            operational_presence.populate()
-
-    def output_food_security(self):
-        if not self._themes_to_run or "food_security" in self._themes_to_run:
-            food_security = FoodSecurity(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            food_security.populate()
-
-    def output_humanitarian_needs(self):
-        if not self._themes_to_run or "humanitarian_needs" in self._themes_to_run:
-            humanitarian_needs = HumanitarianNeeds(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            humanitarian_needs.populate()
+        with self._run_report.stage("run"):
+            self._runner.run()
 
-    def output_national_risk(self):
-        if not self._themes_to_run or "national_risk" in self._themes_to_run:
-            results = self._runner.get_hapi_results(
-                self._configurable_scrapers["national_risk"]
-            )
-            national_risk = NationalRisk(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                results=results,
-            )
-            national_risk.populate()
-
-    def output_refugees(self):
-        if not self._themes_to_run or "refugees" in self._themes_to_run:
-            refugees = Refugees(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            refugees.populate()
-
-    def output_returnees(self):
-        if not self._themes_to_run or "returnees" in self._themes_to_run:
-            returnees = Returnees(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            returnees.populate()
-
-    def output_idps(self):
-        if not self._themes_to_run or "idps" in self._themes_to_run:
-            idps = IDPs(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            idps.populate()
-
-    def output_funding(self):
-        if not self._themes_to_run or "funding" in self._themes_to_run:
-            funding = Funding(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            funding.populate()
-
-    def output_poverty_rate(self):
-        if not self._themes_to_run or "poverty_rate" in self._themes_to_run:
-            poverty_rate = PovertyRate(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            poverty_rate.populate()
-
-    def output_conflict_event(self):
-        if not self._themes_to_run or "conflict_event" in self._themes_to_run:
-            conflict_event = ConflictEvent(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
-            )
-            conflict_event.populate()
-
-    def output_food_prices(self):
-        if not self._themes_to_run or "food_prices" in self._themes_to_run:
-            currency = Currency(
-                database=self._database,
-                configuration=self._configuration,
-                key="wfp_currency",
-                error_handler=self._error_handler,
-            )
-            currency.populate()
-            wfp_commodity = WFPCommodity(
-                database=self._database,
-                configuration=self._configuration,
-                key="wfp_commodity",
-                error_handler=self._error_handler,
-            )
-            wfp_commodity.populate()
-            wfp_market = WFPMarket(
-                database=self._database,
-                admins=self._admins,
-                configuration=self._configuration,
-                key="wfp_market",
-                error_handler=self._error_handler,
+    def should_output(self, theme: str) -> bool:
+        return not self._themes_to_run or theme in self._themes_to_run
+
+    def get_requirements(self) -> Set[str]:
+        """Get the components needed by the themes to run from
+        THEME_REQUIREMENTS.
+
+        Returns:
+            Set[str]: Components needed by the themes to run
+        """
+        requirements = set()
+        for theme, theme_requirements in THEME_REQUIREMENTS.items():
+            if self.should_output(theme):
+                requirements.update(theme_requirements)
+        return requirements
+
+    def get_admin_path(self) -> str:
+        """Get the path of the global p-codes, downloading them on first use.
+
+        Returns:
+            str: Path of global p-codes file
+        """
+        with self._lock:
+            if self._admin_path is None:
+                reader = get_reader("hdx")
+                self._admin_path = reader.download_file(AdminLevel.admin_url)
+            return self._admin_path
+
+    def setup_admin_levels(self) -> None:
+        """Set up admin one and admin two levels from the global p-codes (or
+        the cache of them) and log their name mappings and replacements, if
+        not already done.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._adminone is not None:
+                return
+            reader = get_reader("hdx")
+
+            def get_paths() -> Tuple[str, str]:
+                return (
+                    self.get_admin_path(),
+                    reader.download_file(AdminLevel.formats_url),
+                )
+
+            cache_folder = self._configuration.get("admin_cache_folder")
+            source_versions = None
+            if cache_folder and not reader.use_saved:
+                source_versions = get_resource_versions(
+                    (AdminLevel.admin_url, AdminLevel.formats_url),
+                    self._configuration,
+                )
+            self._adminone, self._admintwo = get_admin_levels(
+                self._configuration, get_paths, cache_folder, source_versions
             )
-            wfp_market.populate()
-            food_price = FoodPrice(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
+        logger.info("Admin one name mappings:")
+        self._adminone.output_admin_name_mappings()
+        logger.info("Admin two name mappings:")
+        self._admintwo.output_admin_name_mappings()
+        logger.info("Admin two name replacements:")
+        self._admintwo.output_admin_name_replacements()
+
+    def output_locations(self, database: Database) -> None:
+        if self._incremental and self._locations.load():
+            logger.info("Using existing locations")
+            return
+        self._locations.populate()
+
+    def output_admins(self, database: Database) -> None:
+        if self._incremental and self._admins.load():
+            logger.info("Using existing admins")
+            return
+        if "admin_levels" in self._requirements:
+            self.setup_admin_levels()
+        libhxl_dataset = AdminLevel.get_libhxl_dataset(
+            url=self.get_admin_path()
+        ).cache()
+        self._admins.populate(libhxl_dataset)
+
+    def output_metadata(self, database: Database) -> None:
+        self._metadata.populate()
+
+    def output_org_type(self, database: Database) -> None:
+        org_type = OrgType(
+            database=database,
+        )
+        if self._incremental and org_type.is_populated(DBOrgType):
+            logger.info("Using existing org types")
+            return
+        org_type.populate()
+
+    def output_sector(self, database: Database) -> None:
+        sector = Sector(
+            database=database,
+        )
+        if self._incremental and sector.is_populated(DBSector):
+            logger.info("Using existing sectors")
+            return
+        sector.populate()
+
+    def output_population(self, database: Database) -> None:
+        population = Population(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        population.populate()
+
+    def output_org(self, database: Database) -> None:
+        org = Org(
+            database=database,
+            metadata=self._metadata,
+            configuration=self._configuration,
+        )
+        org.populate()
+
+    def output_operational_presence(self, database: Database) -> None:
+        operational_presence = OperationalPresence(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        operational_presence.populate()
+
+    def output_food_security(self, database: Database) -> None:
+        food_security = FoodSecurity(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        food_security.populate()
+
+    def output_humanitarian_needs(self, database: Database) -> None:
+        humanitarian_needs = HumanitarianNeeds(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        humanitarian_needs.populate()
+
+    def output_national_risk(self, database: Database) -> None:
+        results = self._runner.get_hapi_results(
+            self._configurable_scrapers["national_risk"]
+        )
+        national_risk = NationalRisk(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            results=results,
+        )
+        national_risk.populate()
+
+    def output_refugees(self, database: Database) -> None:
+        refugees = Refugees(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=None,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        refugees.populate()
+
+    def output_returnees(self, database: Database) -> None:
+        returnees = Returnees(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=None,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        returnees.populate()
+
+    def output_idps(self, database: Database) -> None:
+        idps = IDPs(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        idps.populate()
+
+    def output_funding(self, database: Database) -> None:
+        funding = Funding(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=None,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        funding.populate()
+
+    def output_poverty_rate(self, database: Database) -> None:
+        poverty_rate = PovertyRate(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        poverty_rate.populate()
+
+    def output_conflict_event(self, database: Database) -> None:
+        conflict_event = ConflictEvent(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        conflict_event.populate()
+
+    def output_currency(self, database: Database) -> None:
+        currency = Currency(
+            database=database,
+            configuration=self._configuration,
+            key="wfp_currency",
+            error_handler=self._error_handler,
+        )
+        currency.populate()
+
+    def output_wfp_commodity(self, database: Database) -> None:
+        wfp_commodity = WFPCommodity(
+            database=database,
+            configuration=self._configuration,
+            key="wfp_commodity",
+            error_handler=self._error_handler,
+        )
+        wfp_commodity.populate()
+
+    def output_wfp_market(self, database: Database) -> None:
+        wfp_market = WFPMarket(
+            database=database,
+            admins=self._admins,
+            configuration=self._configuration,
+            key="wfp_market",
+            error_handler=self._error_handler,
+        )
+        wfp_market.populate()
+
+    def output_food_prices(self, database: Database) -> None:
+        food_price = FoodPrice(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        food_price.populate()
+
+    def output_rainfall(self, database: Database) -> None:
+        rainfall = Rainfall(
+            database=database,
+            metadata=self._metadata,
+            locations=self._locations,
+            admins=self._admins,
+            configuration=self._configuration,
+            error_handler=self._error_handler,
+        )
+        rainfall.populate()
+
+    def record_sources(
+        self, database: Database, theme: str, entries: MANIFEST_ENTRIES
+    ) -> None:
+        """Record the sources from which a theme was loaded in the manifest.
+
+        Args:
+            database (Database): Database
+            theme (str): Theme
+            entries (MANIFEST_ENTRIES): Entries for sources
+
+        Returns:
+            None
+        """
+        self._manifest.record(database, theme, entries)
+
+    def add_theme_tasks(
+        self,
+        scheduler: ThemeScheduler,
+        theme: str,
+        tasks: ListTuple[Tuple[str, Callable[[Database], None], ListTuple[str]]],
+    ) -> None:
+        """Add the tasks that output a theme if it is to be run. In incremental
+        mode, a theme whose sources are unchanged since they were recorded in
+        the manifest is skipped so that its rows are kept, otherwise a task
+        clearing its tables is added that its tasks depend on, followed by a
+        task that records the theme's sources in the manifest. As runs that
+        are not incremental recreate the schema, they have no manifest, so
+        the first incremental run after them reloads every theme.
+
+        Args:
+            scheduler (ThemeScheduler): Scheduler to which to add tasks
+            theme (str): Theme
+            tasks (ListTuple[Tuple]): Name, function and dependencies of tasks
+
+        Returns:
+            None
+        """
+        if not self.should_output(theme):
+            return
+        dataset_names = THEME_DATASETS.get(theme)
+        entries = None
+        clear_dependencies = ()
+        if self._incremental:
+            if dataset_names:
+                entries = self._manifest.get_changed_entries(theme, dataset_names)
+                if entries is None:
+                    logger.info(f"Skipping {theme} as its sources are unchanged")
+                    return
+            clear_task = f"clear_{theme}"
+            scheduler.add_task(
+                clear_task,
+                partial(
+                    self._manifest.clear, theme=theme, hapi_tables=THEME_TABLES[theme]
+                ),
             )
-            food_price.populate()
-
-    def output_rainfall(self):
-        if not self._themes_to_run or "rainfall" in self._themes_to_run:
-            rainfall = Rainfall(
-                database=self._database,
-                metadata=self._metadata,
-                locations=self._locations,
-                admins=self._admins,
-                configuration=self._configuration,
-                error_handler=self._error_handler,
+            clear_dependencies = (clear_task,)
+        for name, function, dependencies in tasks:
+            scheduler.add_task(name, function, tuple(dependencies) + clear_dependencies)
+        if entries is not None:
+            scheduler.add_task(
+                f"record_{theme}",
+                partial(self.record_sources, theme=theme, entries=entries),
+                [task[0] for task in tasks],
             )
-            rainfall.populate()
+
+    def add_output_tasks(self, scheduler: ThemeScheduler) -> None:
+        """Add the tasks that write to the database to the scheduler along with
+        the tasks each one depends on. Locations, admins and metadata
+        share the session of the Database passed to Pipelines so they run one
+        after another. All other tasks write with the session of the Database
+        they are given. In incremental mode, the locations, admins, org types
+        and sectors already in the database are kept while metadata is
+        updated.
+
+        Args:
+            scheduler (ThemeScheduler): Scheduler to which to add tasks
+
+        Returns:
+            None
+        """
+        scheduler.add_task("locations", self.output_locations)
+        scheduler.add_task("admins", self.output_admins, ("locations",))
+        scheduler.add_task("metadata", self.output_metadata, ("admins",))
+        scheduler.add_task("org_type", self.output_org_type)
+        scheduler.add_task("sector", self.output_sector)
+        admin_theme = ("admins", "metadata")
+        national_theme = ("locations", "metadata")
+        self.add_theme_tasks(
+            scheduler,
+            "population",
+            (("population", self.output_population, admin_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "operational_presence",
+            (
+                ("org", self.output_org, ("org_type", "metadata")),
+                (
+                    "operational_presence",
+                    self.output_operational_presence,
+                    ("org", "sector") + admin_theme,
+                ),
+            ),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "food_security",
+            (("food_security", self.output_food_security, admin_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "humanitarian_needs",
+            (
+                (
+                    "humanitarian_needs",
+                    self.output_humanitarian_needs,
+                    ("sector",) + admin_theme,
+                ),
+            ),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "national_risk",
+            (("national_risk", self.output_national_risk, national_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "refugees",
+            (("refugees", self.output_refugees, national_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "returnees",
+            (("returnees", self.output_returnees, national_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler, "idps", (("idps", self.output_idps, admin_theme),)
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "funding",
+            (("funding", self.output_funding, national_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "poverty_rate",
+            (("poverty_rate", self.output_poverty_rate, admin_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "conflict_event",
+            (("conflict_event", self.output_conflict_event, admin_theme),),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "food_prices",
+            (
+                ("currency", self.output_currency, ()),
+                ("wfp_commodity", self.output_wfp_commodity, ()),
+                ("wfp_market", self.output_wfp_market, ("admins",)),
+                (
+                    "food_prices",
+                    self.output_food_prices,
+                    ("currency", "wfp_commodity", "wfp_market", "metadata"),
+                ),
+            ),
+        )
+        self.add_theme_tasks(
+            scheduler,
+            "rainfall",
+            (("rainfall", self.output_rainfall, admin_theme),),
+        )
 
     def output(self):
-        self._locations.populate()
-        self._admins.populate()
-        self._metadata.populate()
-        self._org_type.populate()
-        self._sector.populate()
-        self.output_population()
-        self.output_operational_presence()
-        self.output_food_security()
-        self.output_humanitarian_needs()
-        self.output_national_risk()
-        self.output_refugees()
-        self.output_returnees()
-        self.output_idps()
-        self.output_funding()
-        self.output_poverty_rate()
-        self.output_conflict_event()
-        self.output_food_prices()
-        self.output_rainfall()
+        scheduler = ThemeScheduler(self._database, self._workers, self._run_report)
+        with self._run_report.stage("check_sources"):
+            self.add_output_tasks(scheduler)
+        scheduler.run()
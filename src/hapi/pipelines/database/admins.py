@@ -2,21 +2,20 @@
 
 import logging
 import re
-from abc import ABC
-from typing import Dict, List, Literal, Optional
+from typing import Dict, List, Literal, Optional, Tuple, Type
 
 import hxl
 from hapi_schema.db_admin1 import DBAdmin1
 from hapi_schema.db_admin2 import DBAdmin2
-from hapi_schema.db_location import DBLocation
+from hapi_schema.utils.base import Base
 from hdx.api.configuration import Configuration
 from hdx.api.utilities.hdx_error_handler import HDXErrorHandler
 from hdx.database import Database
-from hdx.utilities.dateparse import parse_date
-from hxl.filters import AbstractStreamingFilter
 from sqlalchemy import select
 
+from ..utilities.date_parser import parse_iso_date
 from .base_uploader import BaseUploader
+from .bulk_loader import insert_returning_ids
 from .locations import Locations
 
 logger = logging.getLogger(__name__)
@@ -33,120 +32,193 @@ class Admins(BaseUploader):
         configuration: Configuration,
         database: Database,
         locations: Locations,
-        libhxl_dataset: hxl.Dataset,
         error_handler: HDXErrorHandler,
     ):
         super().__init__(database)
         self._limit = configuration["commit_limit"]
         self._orphan_admin2s = configuration["orphan_admin2s"]
         self._locations = locations
-        self._libhxl_dataset = libhxl_dataset
         self._error_handler = error_handler
         self.admin1_data = {}
+        self._admin1_reference_period_starts = {}
         self.admin2_data = {}
-
-    def populate(self) -> None:
+        # Refs resolved from rows keyed by admin level, codes, dataset and
+        # pipeline
+        self._admin1_refs: Dict[Tuple, Optional[int]] = {}
+        self._admin2_refs: Dict[Tuple, Optional[int]] = {}
+
+    def load(self) -> bool:
+        """Load the ids of admin1s and admin2s already in the database.
+
+        Returns:
+            bool: Whether there were any admin1s
+        """
+        self.admin1_data = dict(
+            self._session.execute(select(DBAdmin1.code, DBAdmin1.id)).all()
+        )
+        self.admin2_data = dict(
+            self._session.execute(select(DBAdmin2.code, DBAdmin2.id)).all()
+        )
+        self._admin1_refs = {}
+        self._admin2_refs = {}
+        return len(self.admin1_data) > 0
+
+    def populate(self, libhxl_dataset: hxl.Dataset) -> None:
+        """Populate the admin1 and admin2 tables from the global p-codes.
+
+        Args:
+            libhxl_dataset (hxl.Dataset): Global p-codes dataset
+
+        Returns:
+            None
+        """
+        self._admin1_refs = {}
+        self._admin2_refs = {}
+        columns = libhxl_dataset.columns
+        admin_buckets = self._get_admin_buckets(libhxl_dataset)
         logger.info("Populating admin1 table")
-        self._update_admin_table(
+        admin_rows = self._get_admin_rows(
             desired_admin_level="1",
             parent_dict=self._locations.data,
+            columns=columns,
+            admin_buckets=admin_buckets,
         )
-        self._add_admin1_connector_rows()
-        results = self._session.execute(select(DBAdmin1.id, DBAdmin1.code))
-        self.admin1_data = {result[1]: result[0] for result in results}
+        self.admin1_data = self._insert_admin_rows(DBAdmin1, admin_rows)
+        admin_rows.extend(self._add_admin1_connector_rows())
+        # Unspecified admin2s take the reference period start of their admin1
+        self._admin1_reference_period_starts = {
+            row["code"]: row["reference_period_start"] for row in admin_rows
+        }
         logger.info("Populating admin2 table")
-        self._update_admin_table(
+        admin_rows = self._get_admin_rows(
             desired_admin_level="2",
             parent_dict=self.admin1_data,
+            columns=columns,
+            admin_buckets=admin_buckets,
         )
+        self.admin2_data = self._insert_admin_rows(DBAdmin2, admin_rows)
         self._add_admin2_connector_rows()
-        results = self._session.execute(select(DBAdmin2.id, DBAdmin2.code))
-        for result in results:
-            self.admin2_data[result[1]] = result[0]
 
-    def _update_admin_table(
+    def _insert_admin_rows(
+        self, hapi_table: Type[Base], admin_rows: List[Dict]
+    ) -> Dict:
+        admin_data = insert_returning_ids(
+            self._session, hapi_table, admin_rows, batch_size=self._limit
+        )
+        self._session.commit()
+        return admin_data
+
+    def _get_admin_buckets(
+        self, libhxl_dataset: hxl.Dataset
+    ) -> Dict[str, Dict[str, List[List]]]:
+        """Sort the values of the rows of the admin dataset into buckets by
+        admin level and then country in a single pass, dropping rows of other
+        admin levels and countries."""
+        columns = libhxl_dataset.columns
+        no_columns = len(columns)
+        admin_level_index = _get_column_index(columns, "#geo+admin_level")
+        country_index = _get_column_index(columns, "#country+code")
+        country_codes = set(self._locations.hapi_countries)
+        admin_buckets = {admin_level: {} for admin_level in _ADMIN_LEVELS}
+        for row in libhxl_dataset:
+            values = row.values
+            if len(values) < no_columns:
+                values = values + [None] * (no_columns - len(values))
+            country_buckets = admin_buckets.get(values[admin_level_index])
+            if country_buckets is None:
+                continue
+            country_code = values[country_index]
+            if country_code not in country_codes:
+                continue
+            country_bucket = country_buckets.get(country_code)
+            if country_bucket is None:
+                country_bucket = country_buckets[country_code] = []
+            country_bucket.append(values)
+        return admin_buckets
+
+    def _get_admin_rows(
         self,
         desired_admin_level: _ADMIN_LEVELS_LITERAL,
         parent_dict: Dict,
-    ):
+        columns: List[hxl.Column],
+        admin_buckets: Dict[str, Dict[str, List[List]]],
+    ) -> List[Dict]:
         if desired_admin_level not in _ADMIN_LEVELS:
             raise ValueError(f"Admin levels must be one of {_ADMIN_LEVELS}")
-        # Filter admin level and countries
-        admin_filter = _AdminFilter(
-            source=self._libhxl_dataset,
-            desired_admin_level=desired_admin_level,
-            country_codes=list(self._locations.hapi_countries),
-        )
-        for i, row in enumerate(admin_filter):
-            code = row.get("#adm+code")
-            name = row.get("#adm+name")
-            time_period_start = parse_date(row.get("#date+start"))
-            parent = row.get("#adm+code+parent")
-            parent_ref = parent_dict.get(parent)
-            if not parent_ref:
-                if desired_admin_level == "2" and code in self._orphan_admin2s.keys():
-                    parent_ref = self.admin1_data[
-                        get_admin1_to_location_connector_code(
-                            location_code=self._orphan_admin2s[code]
-                        )
-                    ]
-                else:
-                    logger.warning(f"Missing parent {parent} for code {code}")
-                    continue
-            if desired_admin_level == "1":
-                admin_row = DBAdmin1(
-                    location_ref=parent_ref,
-                    code=code,
-                    name=name,
-                    reference_period_start=time_period_start,
-                )
-            elif desired_admin_level == "2":
-                admin_row = DBAdmin2(
-                    admin1_ref=parent_ref,
-                    code=code,
-                    name=name,
-                    reference_period_start=time_period_start,
+        code_index = _get_column_index(columns, "#adm+code")
+        name_index = _get_column_index(columns, "#adm+name")
+        start_index = _get_column_index(columns, "#date+start")
+        parent_index = _get_column_index(columns, "#adm+code+parent")
+        if desired_admin_level == "1":
+            parent_key = "location_ref"
+        else:
+            parent_key = "admin1_ref"
+        admin_rows = []
+        for country_bucket in admin_buckets[desired_admin_level].values():
+            for values in country_bucket:
+                # Empty values are treated as missing as by hxl's Row.get
+                code = values[code_index] or None
+                name = values[name_index] or None
+                time_period_start = parse_iso_date(values[start_index] or None)
+                parent = values[parent_index] or None
+                parent_ref = parent_dict.get(parent)
+                if not parent_ref:
+                    if (
+                        desired_admin_level == "2"
+                        and code in self._orphan_admin2s.keys()
+                    ):
+                        parent_ref = self.admin1_data[
+                            get_admin1_to_location_connector_code(
+                                location_code=self._orphan_admin2s[code]
+                            )
+                        ]
+                    else:
+                        logger.warning(f"Missing parent {parent} for code {code}")
+                        continue
+                admin_rows.append(
+                    {
+                        parent_key: parent_ref,
+                        "code": code,
+                        "name": name,
+                        "reference_period_start": time_period_start,
+                    }
                 )
-            self._session.add(admin_row)
-            if i % self._limit == 0:
-                self._session.commit()
-        self._session.commit()
+        return admin_rows
 
-    def _add_admin1_connector_rows(self):
+    def _add_admin1_connector_rows(self) -> List[Dict]:
+        admin_rows = []
         for location_code, location_ref in self._locations.data.items():
-            time_period_start = (
-                self._session.query(DBLocation)
-                .filter(DBLocation.id == location_ref)
-                .one()
-                .reference_period_start
-            )
-            admin_row = DBAdmin1(
-                location_ref=location_ref,
-                code=get_admin1_to_location_connector_code(location_code=location_code),
-                name="UNSPECIFIED",
-                is_unspecified=True,
-                reference_period_start=time_period_start,
+            time_period_start = self._locations.reference_period_starts[location_code]
+            admin_rows.append(
+                {
+                    "location_ref": location_ref,
+                    "code": get_admin1_to_location_connector_code(
+                        location_code=location_code
+                    ),
+                    "name": "UNSPECIFIED",
+                    "is_unspecified": True,
+                    "reference_period_start": time_period_start,
+                }
             )
-            self._session.add(admin_row)
-        self._session.commit()
+        self.admin1_data.update(self._insert_admin_rows(DBAdmin1, admin_rows))
+        return admin_rows
 
-    def _add_admin2_connector_rows(self):
+    def _add_admin2_connector_rows(self) -> None:
+        admin_rows = []
         for admin1_code, admin1_ref in self.admin1_data.items():
-            time_period_start = (
-                self._session.query(DBAdmin1)
-                .filter(DBAdmin1.id == admin1_ref)
-                .one()
-                .reference_period_start
-            )
-            admin_row = DBAdmin2(
-                admin1_ref=admin1_ref,
-                code=get_admin2_to_admin1_connector_code(admin1_code=admin1_code),
-                name="UNSPECIFIED",
-                is_unspecified=True,
-                reference_period_start=time_period_start,
+            time_period_start = self._admin1_reference_period_starts[admin1_code]
+            admin_rows.append(
+                {
+                    "admin1_ref": admin1_ref,
+                    "code": get_admin2_to_admin1_connector_code(
+                        admin1_code=admin1_code
+                    ),
+                    "name": "UNSPECIFIED",
+                    "is_unspecified": True,
+                    "reference_period_start": time_period_start,
+                }
             )
-            self._session.add(admin_row)
-        self._session.commit()
+        self.admin2_data.update(self._insert_admin_rows(DBAdmin2, admin_rows))
 
     def get_admin_level(self, pcode: str) -> _ADMIN_LEVELS_LITERAL:
         """Given a pcode, return the admin level."""
@@ -216,12 +288,55 @@ class Admins(BaseUploader):
                 return i
         return 0
 
+    @staticmethod
+    def _get_row_key(
+        row: Dict, dataset_name: str, pipeline: str, admin_level: int
+    ) -> Tuple:
+        key = (admin_level, dataset_name, pipeline, row["location_code"])
+        if admin_level >= 1:
+            key += (row["admin1_code"],)
+        if admin_level == 2:
+            key += (row["admin2_code"],)
+        return key
+
     def get_admin1_ref_from_row(
         self,
         row: Dict,
         dataset_name: str,
         pipeline: str,
         admin_level: int,
+    ) -> Optional[int]:
+        """Get the admin1 ref for a row falling back to the unspecified
+        admin1 of the row's location if its admin1 code is not found. Refs
+        are cached per admin level, dataset, pipeline and codes so each
+        distinct combination is resolved and any missing value reported once.
+
+        Args:
+            row (Dict): Row
+            dataset_name (str): Dataset name for error messages
+            pipeline (str): Pipeline for error messages
+            admin_level (int): Admin level of row
+
+        Returns:
+            Optional[int]: Admin1 ref or None if not found
+        """
+        key = self._get_row_key(row, dataset_name, pipeline, admin_level)
+        try:
+            return self._admin1_refs[key]
+        except KeyError:
+            pass
+        ref = self._resolve_admin1_ref_from_row(
+            row, dataset_name, pipeline, admin_level
+        )
+        self._admin1_refs[key] = ref
+        return ref
+
+    def _resolve_admin1_ref_from_row(
+        self,
+        row: Dict,
+        dataset_name: str,
+        pipeline: str,
+        admin_level: int,
     ) -> Optional[int]:
         if admin_level == 1:
             admin_code = row["admin1_code"]
@@ -258,6 +373,39 @@ class Admins(BaseUploader):
         dataset_name: str,
         pipeline: str,
         admin_level: int,
+    ) -> Optional[int]:
+        """Get the admin2 ref for a row falling back to the unspecified
+        admin2 of the row's admin1 and then of its location if its codes are
+        not found. Refs are cached per admin level, dataset, pipeline and codes
+        so each distinct combination is resolved and any missing value
+        reported once.
+
+        Args:
+            row (Dict): Row
+            dataset_name (str): Dataset name for error messages
+            pipeline (str): Pipeline for error messages
+            admin_level (int): Admin level of row
+
+        Returns:
+            Optional[int]: Admin2 ref or None if not found
+        """
+        key = self._get_row_key(row, dataset_name, pipeline, admin_level)
+        try:
+            return self._admin2_refs[key]
+        except KeyError:
+            pass
+        ref = self._resolve_admin2_ref_from_row(
+            row, dataset_name, pipeline, admin_level
+        )
+        self._admin2_refs[key] = ref
+        return ref
+
+    def _resolve_admin2_ref_from_row(
+        self,
+        row: Dict,
+        dataset_name: str,
+        pipeline: str,
+        admin_level: int,
     ) -> Optional[int]:
         if admin_level == 2:
             admin_code = row["admin2_code"]
@@ -362,23 +510,9 @@ def get_admin2_code_based_on_level(admin_code: str, admin_level: str) -> str:
     return admin2_code
 
 
-class _AdminFilter(AbstractStreamingFilter, ABC):
-    """Filter admin rows by level and country code."""
-
-    def __init__(
-        self,
-        source: hxl.Dataset,
-        desired_admin_level: _ADMIN_LEVELS_LITERAL,
-        country_codes: List[str],
-    ):
-        self._desired_admin_level = desired_admin_level
-        self._country_codes = country_codes
-        super(AbstractStreamingFilter, self).__init__(source)
-
-    def filter_row(self, row):
-        if (
-            row.get("#geo+admin_level") != self._desired_admin_level
-            or row.get("#country+code") not in self._country_codes
-        ):
-            return None
-        return row.values
+def _get_column_index(columns: List[hxl.Column], tag: str) -> int:
+    """Get the index of the first column matching a HXL tag pattern."""
+    index = hxl.TagPattern.parse(tag).find_column_index(columns)
+    if index is None:
+        raise ValueError(f"Admin dataset has no {tag} column!")
+    return index
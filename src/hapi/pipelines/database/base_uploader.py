@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
+from typing import Type
 
+from hapi_schema.utils.base import Base
 from hdx.database import Database
+from sqlalchemy import func, select
 
 
 class BaseUploader(ABC):
@@ -8,6 +11,19 @@ class BaseUploader(ABC):
         self._database = database
         self._session = database.get_session()
 
+    def is_populated(self, hapi_table: Type[Base]) -> bool:
+        """
+        Check whether a table has any rows.
+
+        Args:
+            hapi_table (Type[Base]): Table to check
+
+        Returns:
+            bool: Whether table has rows
+        """
+        statement = select(func.count()).select_from(hapi_table)
+        return self._session.scalar(statement) > 0
+
     @abstractmethod
     def populate(self) -> None:
         """
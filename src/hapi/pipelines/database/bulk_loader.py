@@ -0,0 +1,268 @@
+"""Bulk loading of rows into database tables."""
+
+from decimal import Decimal
+from logging import getLogger
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Type, Union
+
+from hapi_schema.utils.base import Base
+from psycopg import sql
+from sqlalchemy import Column, Table, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..utilities.run_report import add_to_stage
+
+logger = getLogger(__name__)
+
+LOADERS = ("insert", "copy", "copy_binary")
+LOADERS_LITERAL = Literal["insert", "copy", "copy_binary"]
+# Same as the default of Database.batch_populate
+INSERT_BATCH_SIZE = 1000
+
+
+def _to_decimal(value) -> Decimal:
+    return Decimal(str(value))
+
+
+# Values read from csvs are strings (and numerics are bound as floats) but
+# binary COPY needs the Python type of the column
+_BINARY_CONVERTERS = {int: int, float: float, Decimal: _to_decimal}
+
+
+def get_table_identifier(table: Table) -> sql.Identifier:
+    if table.schema:
+        return sql.Identifier(table.schema, table.name)
+    return sql.Identifier(table.name)
+
+
+def _get_binary_types(cursor, table: Table, columns: List[Column]) -> List[int]:
+    # Enums are received from their labels so can be sent as text
+    cursor.execute(
+        """SELECT a.attname,
+                CASE WHEN t.typtype = 'e' THEN 'text'::regtype::oid
+                ELSE a.atttypid END
+           FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid
+           WHERE a.attrelid = %s::regclass AND a.attnum > 0
+           AND NOT a.attisdropped""",
+        (get_table_identifier(table).as_string(cursor),),
+    )
+    oids = dict(cursor.fetchall())
+    return [oids[column.name] for column in columns]
+
+
+def _get_binary_converter(column: Column) -> Optional[Tuple[Type, Callable]]:
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    converter = _BINARY_CONVERTERS.get(python_type)
+    if converter is None:
+        return None
+    return python_type, converter
+
+
+def copy_rows(
+    session: Session,
+    hapi_table: Type[Base],
+    rows: List[Union[Dict, Tuple]],
+    binary: bool = False,
+    columns: Optional[List[str]] = None,
+) -> None:
+    """Load rows into a table using PostgreSQL's COPY FROM STDIN. Rows are
+    dictionaries keyed by the attribute names of the table's columns as for
+    inserts or if columns is given, tuples of the values of those columns.
+    Columns not in the first row (or columns) are left to their defaults. Values
+    go through the same bind processing as an insert would apply eg.
+    conversion of datetimes to UTC without timezone. The session is not
+    committed.
+
+    Args:
+        session (Session): Session to use
+        hapi_table (Type[Base]): Table to load
+        rows (List[Union[Dict, Tuple]]): Rows to load
+        binary (bool): Whether to use binary rather than text format. Defaults to False.
+        columns (Optional[List[str]]): Columns of tuple rows. Defaults to None (dictionary rows).
+
+    Returns:
+        None
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect
+    if dialect.name != "postgresql":
+        raise ValueError(f"COPY loading is not supported by {dialect.name}!")
+    table = hapi_table.__table__
+    if columns is None:
+        keys = [column.key for column in table.columns if column.key in rows[0]]
+        rows = (tuple(row.get(key) for key in keys) for row in rows)
+    else:
+        keys = columns
+    columns = [table.columns[key] for key in keys]
+    processors = [column.type.bind_processor(dialect) for column in columns]
+    statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        get_table_identifier(table),
+        sql.SQL(", ").join(sql.Identifier(column.name) for column in columns),
+    )
+    if binary:
+        statement += sql.SQL(" (FORMAT BINARY)")
+        converters = [_get_binary_converter(column) for column in columns]
+    else:
+        converters = [None] * len(columns)
+    conversions = list(zip(columns, processors, converters))
+    connection = session.connection().connection.driver_connection
+    with connection.cursor() as cursor:
+        if binary:
+            types = _get_binary_types(cursor, table, columns)
+        with cursor.copy(statement) as copy:
+            if binary:
+                copy.set_types(types)
+            for row in rows:
+                values = []
+                for value, (column, processor, converter) in zip(row, conversions):
+                    if processor is not None:
+                        value = processor(value)
+                    if converter is not None and value is not None:
+                        python_type, convert = converter
+                        if not isinstance(value, python_type):
+                            value = convert(value)
+                    values.append(value)
+                copy.write_row(values)
+
+
+def load_rows(
+    session: Session,
+    hapi_table: Type[Base],
+    rows: List[Union[Dict, Tuple]],
+    loader: LOADERS_LITERAL = "insert",
+    columns: Optional[List[str]] = None,
+) -> None:
+    """Load rows into a table and commit using the given loader: "insert" for
+    batched multi-row inserts, "copy" for COPY in text format or
+    "copy_binary" for COPY in binary format. Rows are dictionaries or if
+    columns is given, tuples of the values of those columns.
+
+    Args:
+        session (Session): Session to use
+        hapi_table (Type[Base]): Table to load
+        rows (List[Union[Dict, Tuple]]): Rows to load
+        loader (LOADERS_LITERAL): Loader to use. Defaults to "insert".
+        columns (Optional[List[str]]): Columns of tuple rows. Defaults to None (dictionary rows).
+
+    Returns:
+        None
+    """
+    if loader == "insert":
+        if columns is not None:
+            rows = [dict(zip(columns, row)) for row in rows]
+        statement = insert(hapi_table)
+        for i in range(0, len(rows), INSERT_BATCH_SIZE):
+            session.execute(statement, rows[i : i + INSERT_BATCH_SIZE])
+    elif loader in LOADERS:
+        copy_rows(
+            session, hapi_table, rows, binary=loader == "copy_binary", columns=columns
+        )
+    else:
+        raise ValueError(f"Loader must be one of {LOADERS}")
+    session.commit()
+
+
+def insert_rows(
+    session: Session,
+    hapi_table: Type[Base],
+    rows: List[Dict],
+    batch_size: int = 1000,
+) -> None:
+    """Insert rows in batches of multi-row inserts. The session is not
+    committed.
+
+    Args:
+        session (Session): Session to use
+        hapi_table (Type[Base]): Table to load
+        rows (List[Dict]): Rows to load
+        batch_size (int): Rows per insert. Defaults to 1000.
+
+    Returns:
+        None
+    """
+    statement = insert(hapi_table)
+    for i in range(0, len(rows), batch_size):
+        session.execute(statement, rows[i : i + batch_size])
+    add_to_stage("rows_out", len(rows))
+
+
+def insert_returning_ids(
+    session: Session,
+    hapi_table: Type[Base],
+    rows: List[Dict],
+    key: str = "code",
+    batch_size: int = 1000,
+) -> Dict[Any, int]:
+    """Insert rows in batches of multi-row inserts getting back the generated
+    ids through RETURNING rather than selecting them afterwards. The session
+    is not committed.
+
+    Args:
+        session (Session): Session to use
+        hapi_table (Type[Base]): Table to load
+        rows (List[Union[Dict, Tuple]]): Rows to load
+        key (str): Column by which to key returned ids. Defaults to "code".
+        batch_size (int): Rows per insert. Defaults to 1000.
+
+    Returns:
+        Dict[Any, int]: Dictionary of key column value to id
+    """
+    table = hapi_table.__table__
+    statement = insert(hapi_table).returning(table.c[key], table.c.id)
+    ids = {}
+    for i in range(0, len(rows), batch_size):
+        results = session.execute(statement, rows[i : i + batch_size])
+        for result in results:
+            ids[result[0]] = result[1]
+    add_to_stage("rows_out", len(rows))
+    return ids
+
+
+# Dialects whose inserts support ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_rows(
+    session: Session,
+    hapi_table: Type[Base],
+    rows: List[Dict],
+    batch_size: int = 1000,
+) -> None:
+    """Insert rows in batches of multi-row inserts updating rows whose primary
+    key is already in the table (ON CONFLICT DO UPDATE) on dialects that
+    support it and merging rows one by one otherwise. Rows must not repeat a
+    primary key. The session is not committed.
+
+    Args:
+        session (Session): Session to use
+        hapi_table (Type[Base]): Table to load
+        rows (List[Dict]): Rows to load
+        batch_size (int): Rows per insert. Defaults to 1000.
+
+    Returns:
+        None
+    """
+    if not rows:
+        return
+    dialect_insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if dialect_insert is None:
+        for row in rows:
+            session.merge(hapi_table(**row))
+    else:
+        table = hapi_table.__table__
+        statement = dialect_insert(hapi_table)
+        statement = statement.on_conflict_do_update(
+            index_elements=table.primary_key.columns,
+            set_={
+                column.name: statement.excluded[column.name]
+                for column in table.columns
+                if not column.primary_key
+            },
+        )
+        for i in range(0, len(rows), batch_size):
+            session.execute(statement, rows[i : i + batch_size])
+    add_to_stage("rows_out", len(rows))
@@ -0,0 +1,137 @@
+"""Declarative mappings of the columns of input rows to those of HAPI tables."""
+
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..utilities.reader import Row
+
+
+class ColumnMapping:
+    """Mapping of a column of input rows to a column of a HAPI table. Empty
+    values (None or "") are not coerced and are replaced by the default if
+    one is given, so coercion=int gives the same as x and int(x) while
+    default="" gives the same as x or "". If required is True, empty values
+    are not allowed: the coercion is applied to every value, so
+    coercion=int gives the same as int(x) and raises on empty values, and
+    without a coercion a ValueError is raised. Columns with few distinct
+    values should be marked encode so that rows share their values (see
+    RowWriter).
+
+    Args:
+        target (str): Column of table
+        source (Optional[str]): Column of input rows. Defaults to None (same as target).
+        coercion (Optional[Callable[[Any], Any]]): Function applied to non-empty values. Defaults to None.
+        default (Any): Value used in place of empty values. Defaults to None (keep empty values).
+        encode (bool): Whether to dictionary encode values. Defaults to False.
+        required (bool): Whether empty values raise. Defaults to False.
+    """
+
+    __slots__ = ("target", "source", "coercion", "default", "encode", "required")
+
+    def __init__(
+        self,
+        target: str,
+        source: Optional[str] = None,
+        coercion: Optional[Callable[[Any], Any]] = None,
+        default: Any = None,
+        encode: bool = False,
+        required: bool = False,
+    ) -> None:
+        self.target = target
+        self.source = source or target
+        self.coercion = coercion
+        self.default = default
+        self.encode = encode
+        self.required = required
+
+
+def _get_getter(keys: Sequence) -> Callable[[Any], Tuple]:
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda values: (values[key],)
+    return itemgetter(*keys)
+
+
+def _check_column(column: Sequence, source: str) -> None:
+    for value in column:
+        if value is None or value == "":
+            raise ValueError(f"Required column {source} has an empty value!")
+
+
+def _coerce_column(
+    column: Sequence, coercion: Optional[Callable[[Any], Any]], default: Any
+) -> List:
+    if coercion is None:
+        return [value or default for value in column]
+    if default is None:
+        return [value and coercion(value) for value in column]
+    return [coercion(value) if value else default for value in column]
+
+
+class ColumnTransform:
+    """Column mappings compiled into a transform of batches of input rows into
+    tuples of values in the order of the targets. For each resource, the
+    source columns are looked up once and the values of a row are got with a
+    single itemgetter call. Coercions are then applied a column at a time
+    over the whole batch rather than field by field.
+
+    Args:
+        column_mappings (Sequence[ColumnMapping]): Column mappings
+    """
+
+    def __init__(self, column_mappings: Sequence[ColumnMapping]) -> None:
+        self.targets = tuple(mapping.target for mapping in column_mappings)
+        self._sources = tuple(mapping.source for mapping in column_mappings)
+        self._coercions = [
+            (i, mapping.coercion, mapping.default)
+            for i, mapping in enumerate(column_mappings)
+            if not mapping.required
+            and (mapping.coercion is not None or mapping.default is not None)
+        ]
+        self._required = [
+            (i, mapping.source, mapping.coercion)
+            for i, mapping in enumerate(column_mappings)
+            if mapping.required
+        ]
+        self._dict_getter = _get_getter(self._sources)
+        self._indices: Optional[Dict[str, int]] = None
+        self._row_getter: Optional[Callable[[Row], Tuple]] = None
+
+    def _get_row_getter(self, indices: Dict[str, int]) -> Callable[[Row], Tuple]:
+        # Rows of the same resource share their mapping of header to index
+        if indices is not self._indices:
+            getter = _get_getter([indices[source] for source in self._sources])
+            self._row_getter = lambda row: getter(row.values)
+            self._indices = indices
+        return self._row_getter
+
+    def __call__(self, rows: Iterable[Any]) -> List[Tuple]:
+        """Transform a batch of input rows.
+
+        Args:
+            rows (Iterable[Any]): Input rows (dictionaries or Row objects)
+
+        Returns:
+            List[Tuple]: Values of target columns for each row
+        """
+        values = []
+        for indices, resource_rows in groupby(
+            rows, key=lambda row: getattr(row, "indices", None)
+        ):
+            if indices is None:
+                getter = self._dict_getter
+            else:
+                getter = self._get_row_getter(indices)
+            values.extend(map(getter, resource_rows))
+        if not (self._coercions or self._required) or not values:
+            return values
+        columns = list(zip(*values))
+        for i, coercion, default in self._coercions:
+            columns[i] = _coerce_column(columns[i], coercion, default)
+        for i, source, coercion in self._required:
+            if coercion is None:
+                _check_column(columns[i], source)
+            else:
+                columns[i] = [coercion(value) for value in columns[i]]
+        return list(zip(*columns))
@@ -0,0 +1,115 @@
+"""Defer building the indexes and foreign keys of tables until after a load."""
+
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Engine, text
+
+logger = getLogger(__name__)
+
+_FOREIGN_KEYS_SQL = """SELECT format('%I.%I', n.nspname, t.relname),
+       format('%I', c.conname), pg_get_constraintdef(c.oid)
+FROM pg_constraint c
+JOIN pg_class t ON t.oid = c.conrelid
+JOIN pg_namespace n ON n.oid = t.relnamespace
+WHERE c.contype = 'f' AND n.nspname = :schema_name"""
+
+# Indexes backing primary keys and unique constraints are kept
+_INDEXES_SQL = """SELECT format('%I.%I', n.nspname, t.relname),
+       format('%I.%I', n.nspname, i.relname), pg_get_indexdef(i.oid)
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_class t ON t.oid = x.indrelid
+JOIN pg_namespace n ON n.oid = t.relnamespace
+WHERE n.nspname = :schema_name AND NOT x.indisprimary AND NOT x.indisunique"""
+
+
+class DeferredConstraints:
+    """Drop the foreign keys and non-unique indexes of the tables of a freshly
+    created schema so that they are not checked and maintained row by row
+    while the tables are loaded, then build them afterwards. Foreign keys are
+    added without validation and then the indexes of each table are built
+    and its foreign keys validated, several tables at a time. Only PostgreSQL
+    is supported. On other dialects, nothing is deferred.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        schema_name (str): Schema of tables. Defaults to "public".
+    """
+
+    def __init__(self, engine: Engine, schema_name: str = "public") -> None:
+        self._engine = engine
+        self._schema_name = schema_name
+        # Table to create index statements
+        self._indexes: Dict[str, List[str]] = {}
+        # Table to foreign key names and definitions
+        self._foreign_keys: Dict[str, List[Tuple[str, str]]] = {}
+
+    def drop(self) -> None:
+        """Drop the foreign keys and non-unique indexes of the tables,
+        remembering their definitions. The tables should be empty.
+
+        Returns:
+            None
+        """
+        if self._engine.dialect.name != "postgresql":
+            logger.warning(
+                f"Deferring constraints is not supported by {self._engine.dialect.name}!"
+            )
+            return
+        parameters = {"schema_name": self._schema_name}
+        with self._engine.begin() as connection:
+            foreign_keys = connection.execute(text(_FOREIGN_KEYS_SQL), parameters)
+            for table, name, definition in foreign_keys.all():
+                self._foreign_keys.setdefault(table, []).append((name, definition))
+                connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {name}"))
+            indexes = connection.execute(text(_INDEXES_SQL), parameters)
+            for table, name, definition in indexes.all():
+                self._indexes.setdefault(table, []).append(definition)
+                connection.execute(text(f"DROP INDEX {name}"))
+        logger.info(
+            f"Deferred {sum(len(x) for x in self._foreign_keys.values())} foreign keys and {sum(len(x) for x in self._indexes.values())} indexes"
+        )
+
+    def _build_table(self, table: str) -> None:
+        with self._engine.begin() as connection:
+            for definition in self._indexes.get(table, []):
+                connection.execute(text(definition))
+            for name, _ in self._foreign_keys.get(table, []):
+                connection.execute(
+                    text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+                )
+        logger.info(f"Built indexes and foreign keys of {table}")
+
+    def build(self, workers: int = 1) -> None:
+        """Create the dropped indexes and add and validate the dropped
+        foreign keys. Raises an exception if any rows violate a foreign key.
+
+        Args:
+            workers (int): Number of tables built concurrently. Defaults to 1.
+
+        Returns:
+            None
+        """
+        tables = sorted(self._indexes.keys() | self._foreign_keys.keys())
+        if not tables:
+            return
+        # Adding foreign keys without validation only takes brief locks so
+        # they are all added up front and validated table by table
+        with self._engine.begin() as connection:
+            for table, foreign_keys in self._foreign_keys.items():
+                for name, definition in foreign_keys:
+                    connection.execute(
+                        text(
+                            f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID"
+                        )
+                    )
+        with ThreadPoolExecutor(
+            max_workers=max(workers, 1), thread_name_prefix="constraints"
+        ) as executor:
+            futures = [executor.submit(self._build_table, table) for table in tables]
+            for future in futures:
+                future.result()
+        self._indexes = {}
+        self._foreign_keys = {}
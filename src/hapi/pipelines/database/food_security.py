@@ -1,21 +1,22 @@
 """Functions specific to the food security theme."""
 
 from logging import getLogger
-from typing import Dict
 
 from hapi_schema.db_food_security import DBFoodSecurity
 
+from .column_mapping import ColumnMapping
 from .hapi_subcategory_uploader import HapiSubcategoryUploader
 
 logger = getLogger(__name__)
 
 
 class FoodSecurity(HapiSubcategoryUploader):
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        output_row["ipc_phase"] = row["ipc_phase"]
-        output_row["ipc_type"] = row["ipc_type"]
-        output_row["population_in_phase"] = row["population_in_phase"]
-        output_row["population_fraction_in_phase"] = row["population_fraction_in_phase"]
+    column_mappings = (
+        ColumnMapping("ipc_phase", encode=True),
+        ColumnMapping("ipc_type", encode=True),
+        ColumnMapping("population_in_phase"),
+        ColumnMapping("population_fraction_in_phase"),
+    )
 
     def populate(self) -> None:
         self.hapi_populate(
@@ -1,19 +1,24 @@
 from abc import ABC
 from logging import getLogger
-from typing import Dict, Optional, Type
+from typing import Dict, Optional, Tuple, Type
 
 from hapi_schema.utils.base import Base
 from hdx.api.configuration import Configuration
 from hdx.api.utilities.hdx_error_handler import HDXErrorHandler
 from hdx.database import Database
-from hdx.scraper.framework.utilities.reader import Read
 
 from hapi.pipelines.database.base_uploader import BaseUploader
+from hapi.pipelines.database.row_writer import RowWriter
+from hapi.pipelines.utilities.reader import get_reader, iterate_tabular_rows
+from hapi.pipelines.utilities.run_report import add_to_stage
 
 logger = getLogger(__name__)
 
 
 class HapiBasicUploader(BaseUploader, ABC):
+    # Output columns with few distinct values to dictionary encode
+    encoded_columns: Tuple[str, ...] = ()
+
     def __init__(
         self,
         database: Database,
@@ -37,7 +42,7 @@ class HapiBasicUploader(BaseUploader, ABC):
         hapi_table: Type[Base],
     ) -> None:
         logger.info(f"Populating {self._name} table")
-        reader = Read.get_reader("hdx")
+        reader = get_reader("hdx")
         dataset = reader.read_dataset(self._dataset_name, self._configuration)
         resource = None
         resource_name = self._datasetinfo["resource"]
@@ -50,12 +55,22 @@ class HapiBasicUploader(BaseUploader, ABC):
             )
             return
 
-        url = resource["url"]
-        headers, rows = reader.get_tabular_rows(url, dict_form=True)
-        output_rows = []
-        for row in rows:
-            output_row = self.get_row(row)
-            if output_row:
-                output_rows.append(output_row)
+        positional = self._configuration.get("row_mode", "dict") == "positional"
+        rows = iterate_tabular_rows([resource["url"]], "hdx", dict_form=not positional)
         logger.info(f"Writing to {self._name} table")
-        self._database.batch_populate(output_rows, hapi_table)
+        rows_in = 0
+        with RowWriter(
+            self._database,
+            hapi_table,
+            chunk_size=self._configuration.get("write_chunk_size"),
+            loader=self._configuration.get("loader", "insert"),
+            positional=positional,
+            encoded_columns=self.encoded_columns,
+        ) as row_writer:
+            for row in rows:
+                rows_in += 1
+                output_row = self.get_row(row)
+                if output_row:
+                    row_writer.add(output_row)
+        add_to_stage("rows_in", rows_in)
+        logger.info(f"Wrote {row_writer.no_rows} rows to {self._name} table")
@@ -1,28 +1,45 @@
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
 from logging import getLogger
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Optional, Set, Tuple, Type
 
 from hapi_schema.utils.base import Base
 from hdx.api.configuration import Configuration
 from hdx.api.utilities.hdx_error_handler import HDXErrorHandler
+from hdx.data.dataset import Dataset
 from hdx.database import Database
-from hdx.scraper.framework.utilities.reader import Read
-from hdx.utilities.dateparse import parse_date
 
 from . import admins, locations
 from hapi.pipelines.database.base_uploader import BaseUploader
+from hapi.pipelines.database.column_mapping import ColumnMapping, ColumnTransform
 from hapi.pipelines.database.metadata import Metadata
+from hapi.pipelines.database.row_writer import RowWriter
+from hapi.pipelines.utilities.date_parser import parse_iso_date
+from hapi.pipelines.utilities.reader import get_reader, iterate_tabular_rows
+from hapi.pipelines.utilities.run_report import (
+    add_to_stage,
+    get_current_stage,
+    use_stage,
+)
 
 logger = getLogger(__name__)
 
+# Number of rows scanned for missing metadata and transformed together
+TRANSFORM_BATCH_SIZE = 1000
+
 
 class HapiSubcategoryUploader(BaseUploader, ABC):
+    # Mappings of input columns to the theme specific columns of the table
+    column_mappings: Tuple[ColumnMapping, ...] = ()
+
     def __init__(
         self,
         database: Database,
         metadata: Metadata,
         locations: locations.Locations,
-        admins: admins.Admins,
+        admins: Optional[admins.Admins],
         configuration: Configuration,
         error_handler: HDXErrorHandler,
     ):
@@ -33,8 +50,73 @@ class HapiSubcategoryUploader(BaseUploader, ABC):
         self._configuration = configuration
         self._error_handler = error_handler
 
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        return
+    def _read_datasets(
+        self, dataset_ids: List[str], workers: int
+    ) -> Dict[str, Dataset]:
+        stage = get_current_stage()
+
+        def read_dataset(dataset_id: str) -> Dataset:
+            with use_stage(stage):
+                return get_reader("hdx").read_dataset(dataset_id, self._configuration)
+
+        if workers <= 1 or len(dataset_ids) == 1:
+            return {dataset_id: read_dataset(dataset_id) for dataset_id in dataset_ids}
+        with ThreadPoolExecutor(
+            max_workers=min(workers, len(dataset_ids)),
+            thread_name_prefix="metadata",
+        ) as executor:
+            return dict(zip(dataset_ids, executor.map(read_dataset, dataset_ids)))
+
+    def _add_missing_metadata(
+        self,
+        batch: List,
+        pipeline: str,
+        location_header: str,
+        resources_to_ignore: Set[str],
+        workers: int,
+    ) -> None:
+        # Collect the resources of the batch missing from the metadata, read
+        # their datasets concurrently and add them before the rows are written
+        missing = {}
+        for row in batch:
+            if row.get("error"):
+                continue
+            resource_id = row["resource_hdx_id"]
+            if resource_id in missing or resource_id in resources_to_ignore:
+                continue
+            if self._metadata.has_resource(resource_id):
+                continue
+            missing[resource_id] = (row["dataset_hdx_id"], row.get(location_header))
+        if not missing:
+            return
+        dataset_ids = list(dict.fromkeys(value[0] for value in missing.values()))
+        datasets = self._read_datasets(dataset_ids, workers)
+        dataset_resources = []
+        for resource_id, (dataset_id, countryiso3) in missing.items():
+            dataset = datasets[dataset_id]
+            for resource in dataset.get_resources():
+                if resource["id"] == resource_id:
+                    dataset_resources.append((dataset_id, dataset, resource))
+                    break
+            else:
+                self._error_handler.add_message(
+                    pipeline,
+                    dataset["name"],
+                    f"resource {resource_id} does not exist in dataset for {countryiso3}",
+                )
+                resources_to_ignore.add(resource_id)
+        if dataset_resources:
+            self._metadata.add_datasets_resources(dataset_resources)
+
+    @staticmethod
+    def _write_batch(
+        row_writer: RowWriter, transform: ColumnTransform, batch: List
+    ) -> None:
+        targets = transform.targets
+        values = transform([row for _, row in batch])
+        for (output_row, _), row_values in zip(batch, values):
+            output_row.update(zip(targets, row_values))
+            row_writer.add(output_row)
 
     def hapi_populate(
         self,
@@ -51,97 +133,112 @@ class HapiSubcategoryUploader(BaseUploader, ABC):
             pipeline.append(part.capitalize())
         pipeline = " ".join(pipeline)
         logger.info(f"Populating {log_name} table")
-        reader = Read.get_reader("hdx")
+        reader = get_reader("hdx")
         dataset = reader.read_dataset(f"hdx-hapi-{name_suffix}", self._configuration)
-        resources_to_ignore = []
-        output_rows = []
+        resources_to_ignore = set()
+        if location_headers is None:
+            location_headers = ["location_code"]
+        logger.info(f"Writing to {log_name} table")
+        rows_in = 0
+        urls = []
         for resource in dataset.get_resources()[0:end_resource]:
             if resource_name_match:
                 if resource_name_match not in resource["name"]:
                     continue
-            url = resource["url"]
-            headers, rows = reader.get_tabular_rows(url, dict_form=True)
-
-            for row in rows:
-                if row.get("error"):
-                    continue
-                resource_id = row["resource_hdx_id"]
-                if resource_id in resources_to_ignore:
-                    continue
-                dataset_id = row["dataset_hdx_id"]
-                dataset_name = self._metadata.get_dataset_name(dataset_id)
-                if dataset_name:
-                    output_str = dataset_name
-                else:
-                    output_str = dataset_id
-
-                if location_headers is None:
-                    location_headers = ["location_code"]
-                countryiso3 = row.get(location_headers[0])
-                resource_name = self._metadata.get_resource_name(resource_id)
-                if not resource_name:
-                    dataset = reader.read_dataset(dataset_id, self._configuration)
-                    found = False
-                    for resource in dataset.get_resources():
-                        if resource["id"] == resource_id:
-                            if not dataset_name:
-                                self._metadata.add_dataset(dataset)
-                            self._metadata.add_resource(dataset_id, resource)
-                            found = True
-                            break
-                    if not found:
-                        self._error_handler.add_message(
-                            pipeline,
-                            dataset["name"],
-                            f"resource {resource_id} does not exist in dataset for {countryiso3}",
-                        )
-                        resources_to_ignore.append(resource_id)
+            urls.append(resource["url"])
+        # Resources are downloaded and parsed concurrently but rows arrive in
+        # resource order so output and error messages are deterministic
+        resource_workers = self._configuration.get("resource_workers", 1)
+        positional = self._configuration.get("row_mode", "dict") == "positional"
+        column_mappings = list(self.column_mappings)
+        if max_admin_level in (1, 2):
+            column_mappings.append(
+                ColumnMapping("provider_admin1_name", default="", encode=True)
+            )
+        if max_admin_level == 2:
+            column_mappings.append(
+                ColumnMapping("provider_admin2_name", default="", encode=True)
+            )
+        transform = ColumnTransform(column_mappings)
+        with (
+            RowWriter(
+                self._database,
+                hapi_table,
+                chunk_size=self._configuration.get("write_chunk_size"),
+                loader=self._configuration.get("loader", "insert"),
+                positional=positional,
+                encoded_columns=[
+                    mapping.target for mapping in column_mappings if mapping.encode
+                ],
+            ) as row_writer,
+            closing(
+                iterate_tabular_rows(
+                    urls, "hdx", resource_workers, dict_form=not positional
+                )
+            ) as rows,
+        ):
+            for batch in iter(lambda: list(islice(rows, TRANSFORM_BATCH_SIZE)), []):
+                rows_in += len(batch)
+                self._add_missing_metadata(
+                    batch,
+                    pipeline,
+                    location_headers[0],
+                    resources_to_ignore,
+                    resource_workers,
+                )
+                output_rows = []
+                for row in batch:
+                    if row.get("error"):
                         continue
+                    resource_id = row["resource_hdx_id"]
+                    if resource_id in resources_to_ignore:
+                        continue
+                    dataset_id = row["dataset_hdx_id"]
+                    dataset_name = self._metadata.get_dataset_name(dataset_id)
+                    if dataset_name:
+                        output_str = dataset_name
+                    else:
+                        output_str = dataset_id
 
-                output_row = {
-                    "resource_hdx_id": resource_id,
-                    "reference_period_start": parse_date(row["reference_period_start"]),
-                    "reference_period_end": parse_date(
-                        row["reference_period_end"], max_time=True
-                    ),
-                }
-                if max_admin_level is not None:
-                    admin_level = self._admins.get_admin_level_from_row(
-                        row, max_admin_level
-                    )
-                    if max_admin_level == 2:
-                        admin2_ref = self._admins.get_admin2_ref_from_row(
-                            row,
-                            output_str,
-                            pipeline,
-                            admin_level,
-                        )
-                        output_row["admin2_ref"] = admin2_ref
-                        output_row["provider_admin1_name"] = (
-                            row["provider_admin1_name"] or ""
-                        )
-                        output_row["provider_admin2_name"] = (
-                            row["provider_admin2_name"] or ""
-                        )
-                    elif max_admin_level == 1:
-                        admin1_ref = self._admins.get_admin1_ref_from_row(
-                            row,
-                            output_str,
-                            pipeline,
-                            admin_level,
-                        )
-                        output_row["admin1_ref"] = admin1_ref
-                        output_row["provider_admin1_name"] = (
-                            row["provider_admin1_name"] or ""
-                        )
-                    elif max_admin_level == 0:
-                        for location_header in location_headers:
-                            countryiso3 = row[location_header]
-                            output_header = location_header.replace("_code", "_ref")
-                            location_ref = self._locations.data[countryiso3]
-                            output_row[output_header] = location_ref
-
-                self.populate_row(output_row, row)
-                output_rows.append(output_row)
-        logger.info(f"Writing to {log_name} table")
-        self._database.batch_populate(output_rows, hapi_table)
+                    output_row = {
+                        "resource_hdx_id": resource_id,
+                        "reference_period_start": parse_iso_date(
+                            row["reference_period_start"]
+                        ),
+                        "reference_period_end": parse_iso_date(
+                            row["reference_period_end"], max_time=True
+                        ),
+                    }
+                    if max_admin_level is not None:
+                        if max_admin_level == 2:
+                            admin_level = self._admins.get_admin_level_from_row(
+                                row, max_admin_level
+                            )
+                            admin2_ref = self._admins.get_admin2_ref_from_row(
+                                row,
+                                output_str,
+                                pipeline,
+                                admin_level,
+                            )
+                            output_row["admin2_ref"] = admin2_ref
+                        elif max_admin_level == 1:
+                            admin_level = self._admins.get_admin_level_from_row(
+                                row, max_admin_level
+                            )
+                            admin1_ref = self._admins.get_admin1_ref_from_row(
+                                row,
+                                output_str,
+                                pipeline,
+                                admin_level,
+                            )
+                            output_row["admin1_ref"] = admin1_ref
+                        elif max_admin_level == 0:
+                            for location_header in location_headers:
+                                countryiso3 = row[location_header]
+                                output_header = location_header.replace("_code", "_ref")
+                                location_ref = self._locations.data[countryiso3]
+                                output_row[output_header] = location_ref
+                    output_rows.append((output_row, row))
+                self._write_batch(row_writer, transform, output_rows)
+        add_to_stage("rows_in", rows_in)
+        logger.info(f"Wrote {row_writer.no_rows} rows to {log_name} table")
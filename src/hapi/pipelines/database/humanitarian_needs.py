@@ -1,10 +1,10 @@
 """Functions specific to the humanitarian needs theme."""
 
 from logging import getLogger
-from typing import Dict
 
 from hapi_schema.db_humanitarian_needs import DBHumanitarianNeeds
 
+from hapi.pipelines.database.column_mapping import ColumnMapping
 from hapi.pipelines.database.hapi_subcategory_uploader import (
     HapiSubcategoryUploader,
 )
@@ -13,11 +13,12 @@ logger = getLogger(__name__)
 
 
 class HumanitarianNeeds(HapiSubcategoryUploader):
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        output_row["category"] = row["category"] or ""
-        output_row["sector_code"] = row["sector_code"]
-        output_row["population_status"] = row["population_status"]
-        output_row["population"] = row["population"]
+    column_mappings = (
+        ColumnMapping("category", default="", encode=True),
+        ColumnMapping("sector_code", encode=True),
+        ColumnMapping("population_status", encode=True),
+        ColumnMapping("population"),
+    )
 
     def populate(self) -> None:
         self.hapi_populate(
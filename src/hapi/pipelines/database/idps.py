@@ -1,21 +1,22 @@
 """Functions specific to the idps theme."""
 
 from logging import getLogger
-from typing import Dict
 
 from hapi_schema.db_idps import DBIDPs
 
+from .column_mapping import ColumnMapping
 from .hapi_subcategory_uploader import HapiSubcategoryUploader
 
 logger = getLogger(__name__)
 
 
 class IDPs(HapiSubcategoryUploader):
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        output_row["assessment_type"] = row["assessment_type"]
-        output_row["reporting_round"] = row["reporting_round"]
-        output_row["operation"] = row["operation"]
-        output_row["population"] = row["population"]
+    column_mappings = (
+        ColumnMapping("assessment_type", encode=True),
+        ColumnMapping("reporting_round"),
+        ColumnMapping("operation", encode=True),
+        ColumnMapping("population"),
+    )
 
     def populate(self) -> None:
         self.hapi_populate(
@@ -7,8 +7,10 @@ from hdx.api.configuration import Configuration
 from hdx.database import Database
 from hdx.location.country import Country
 from hdx.utilities.dateparse import parse_date
+from sqlalchemy import select
 
 from .base_uploader import BaseUploader
+from .bulk_loader import insert_returning_ids
 
 
 class Locations(BaseUploader):
@@ -30,19 +32,41 @@ class Locations(BaseUploader):
         else:
             self.hapi_countries = list(Country.countriesdata()["countries"].keys())
         self.data = {}
+        self.reference_period_starts = {}
+
+    def load(self) -> bool:
+        """Load the ids and reference period starts of locations already in
+        the database.
+
+        Returns:
+            bool: Whether there were any locations
+        """
+        statement = select(
+            DBLocation.code, DBLocation.id, DBLocation.reference_period_start
+        )
+        for code, location_id, reference_period_start in self._session.execute(
+            statement
+        ):
+            self.data[code] = location_id
+            self.reference_period_starts[code] = reference_period_start
+        return len(self.data) > 0
 
     def populate(self) -> None:
+        rows = []
         for country in Country.countriesdata()["countries"].values():
             code = country["#country+code+v_iso3"]
             has_hrp = True if country["#indicator+bool+hrp"] == "Y" else False
             in_gho = True if country["#indicator+bool+gho"] == "Y" else False
-            location_row = DBLocation(
-                code=code,
-                name=country["#country+name+preferred"],
-                has_hrp=has_hrp,
-                in_gho=in_gho,
-                reference_period_start=parse_date(country["#date+start"]),
+            reference_period_start = parse_date(country["#date+start"])
+            rows.append(
+                {
+                    "code": code,
+                    "name": country["#country+name+preferred"],
+                    "has_hrp": has_hrp,
+                    "in_gho": in_gho,
+                    "reference_period_start": reference_period_start,
+                }
             )
-            self._session.add(location_row)
-            self._session.commit()
-            self.data[code] = location_row.id
+            self.reference_period_starts[code] = reference_period_start
+        self.data.update(insert_returning_ids(self._session, DBLocation, rows))
+        self._session.commit()
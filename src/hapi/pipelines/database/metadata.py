@@ -1,6 +1,7 @@
 import logging
 from datetime import datetime
-from typing import Dict, Optional
+from threading import RLock
+from typing import Dict, List, Optional, Set, Tuple
 
 from hapi_schema.db_dataset import DBDataset
 from hapi_schema.db_resource import DBResource
@@ -11,6 +12,7 @@ from hdx.scraper.framework.runner import Runner
 from hdx.scraper.framework.utilities.reader import Read
 
 from .base_uploader import BaseUploader
+from .bulk_loader import upsert_rows
 
 logger = logging.getLogger(__name__)
 
@@ -22,82 +24,92 @@ class Metadata(BaseUploader):
         self._today = today
         self._dataset_id_to_name = {}
         self._resource_id_to_name = {}
+        # Datasets and resources written in this run. Rows left in the
+        # database by an earlier run are refreshed when first written.
+        self._dataset_ids: Set[str] = set()
+        self._resource_ids: Set[str] = set()
+        # Themes may add metadata from several threads. They write to their
+        # own sessions so what is added here is committed straight away.
+        self._lock = RLock()
 
     def populate(self) -> None:
+        with self._lock:
+            self._populate()
+
+    def _populate(self) -> None:
         logger.info("Populating metadata")
         datasets = self._runner.get_hapi_metadata()
+        dataset_rows = {}
+        resource_rows = {}
         for dataset_id, dataset in datasets.items():
-            # First add dataset
-
-            # Make sure dataset hasn't already been added - hapi_metadata
-            # contains duplicate datasets since it contains
-            # dataset-resource pairs
-            if dataset_id in self._dataset_id_to_name:
-                continue
-            dataset_name = dataset["hdx_stub"]
-            dataset_row = DBDataset(
-                hdx_id=dataset_id,
-                hdx_stub=dataset_name,
-                title=dataset["title"],
-                hdx_provider_stub=dataset["hdx_provider_stub"],
-                hdx_provider_name=dataset["hdx_provider_name"],
-            )
-            self._session.add(dataset_row)
-            self._session.commit()
-            self._dataset_id_to_name[dataset_id] = dataset_name
-
-            resources = dataset["resources"]
-            for resource_id, resource in resources.items():
-                resource_name = resource["name"]
-                # Then add the resources
-                resource_row = DBResource(
-                    hdx_id=resource_id,
-                    dataset_hdx_id=dataset_row.hdx_id,
-                    name=resource_name,
-                    format=resource["format"],
-                    update_date=resource["update_date"],
-                    is_hxl=resource["is_hxl"],
-                    download_url=resource["download_url"],
-                    hapi_updated_date=self._today,
-                )
-                self._session.add(resource_row)
-                self._session.commit()
-                self._resource_id_to_name[resource_id] = resource_name
+            dataset_rows[dataset_id] = {
+                "hdx_id": dataset_id,
+                "hdx_stub": dataset["hdx_stub"],
+                "title": dataset["title"],
+                "hdx_provider_stub": dataset["hdx_provider_stub"],
+                "hdx_provider_name": dataset["hdx_provider_name"],
+            }
+            for resource_id, resource in dataset["resources"].items():
+                resource_rows[resource_id] = {
+                    "hdx_id": resource_id,
+                    "dataset_hdx_id": dataset_id,
+                    "name": resource["name"],
+                    "format": resource["format"],
+                    "update_date": resource["update_date"],
+                    "is_hxl": resource["is_hxl"],
+                    "download_url": resource["download_url"],
+                    "hapi_updated_date": self._today,
+                }
+        self._add_rows(dataset_rows, resource_rows)
+
+    def _add_rows(
+        self, dataset_rows: Dict[str, Dict], resource_rows: Dict[str, Dict]
+    ) -> None:
+        # Datasets are upserted before the resources that reference them and
+        # all are committed together
+        upsert_rows(self._session, DBDataset, list(dataset_rows.values()))
+        upsert_rows(self._session, DBResource, list(resource_rows.values()))
+        self._session.commit()
+        for dataset_id, dataset_row in dataset_rows.items():
+            self._dataset_id_to_name[dataset_id] = dataset_row["hdx_stub"]
+            self._dataset_ids.add(dataset_id)
+        for resource_id, resource_row in resource_rows.items():
+            self._resource_id_to_name[resource_id] = resource_row["name"]
+            self._resource_ids.add(resource_id)
 
     def add_hapi_dataset_metadata(self, hapi_dataset_metadata: Dict) -> str:
         dataset_id = hapi_dataset_metadata["hdx_id"]
-        dataset_name = hapi_dataset_metadata["hdx_stub"]
-        dataset_row = DBDataset(
-            hdx_id=dataset_id,
-            hdx_stub=hapi_dataset_metadata["hdx_stub"],
-            title=hapi_dataset_metadata["title"],
-            hdx_provider_stub=hapi_dataset_metadata["hdx_provider_stub"],
-            hdx_provider_name=hapi_dataset_metadata["hdx_provider_name"],
-        )
-        self._session.add(dataset_row)
-
-        self._dataset_id_to_name[dataset_id] = dataset_name
+        with self._lock:
+            if dataset_id in self._dataset_ids:
+                return dataset_id
+            dataset_row = {
+                "hdx_id": dataset_id,
+                "hdx_stub": hapi_dataset_metadata["hdx_stub"],
+                "title": hapi_dataset_metadata["title"],
+                "hdx_provider_stub": hapi_dataset_metadata["hdx_provider_stub"],
+                "hdx_provider_name": hapi_dataset_metadata["hdx_provider_name"],
+            }
+            self._add_rows({dataset_id: dataset_row}, {})
         return dataset_id
 
     def add_hapi_resource_metadata(
         self, dataset_id: str, hapi_resource_metadata: Dict
     ) -> None:
         resource_id = hapi_resource_metadata["hdx_id"]
-        resource_name = hapi_resource_metadata["name"]
         hapi_resource_metadata["dataset_hdx_id"] = dataset_id
         hapi_resource_metadata["is_hxl"] = True
         hapi_resource_metadata["hapi_updated_date"] = self._today
 
-        resource_row = DBResource(**hapi_resource_metadata)
-        self._resource_id_to_name[resource_id] = resource_name
-        self._session.add(resource_row)
+        with self._lock:
+            if resource_id in self._resource_ids:
+                return
+            self._add_rows({}, {resource_id: hapi_resource_metadata})
 
     def add_hapi_metadata(
         self, hapi_dataset_metadata: Dict, hapi_resource_metadata: Dict
     ) -> None:
         dataset_id = self.add_hapi_dataset_metadata(hapi_dataset_metadata)
         self.add_hapi_resource_metadata(dataset_id, hapi_resource_metadata)
-        self._session.commit()
 
     def get_hapi_dataset_metadata(self, dataset: Dataset) -> Dict:
         time_period = dataset.get_time_period()
@@ -117,11 +129,60 @@ class Metadata(BaseUploader):
         hapi_resource_metadata = Read.get_hapi_resource_metadata(resource)
         self.add_hapi_resource_metadata(dataset_id, hapi_resource_metadata)
 
+    def add_datasets_resources(
+        self, dataset_resources: List[Tuple[str, Dataset, Resource]]
+    ) -> None:
+        """Add or update resources and their datasets, skipping any already
+        written in this run, in one commit.
+
+        Args:
+            dataset_resources (List[Tuple[str, Dataset, Resource]]): Dataset ids, datasets and resources
+
+        Returns:
+            None
+        """
+        dataset_rows = {}
+        resource_rows = {}
+        with self._lock:
+            for dataset_id, dataset, resource in dataset_resources:
+                if (
+                    dataset_id not in self._dataset_ids
+                    and dataset_id not in dataset_rows
+                ):
+                    hapi_dataset_metadata = self.get_hapi_dataset_metadata(dataset)
+                    dataset_rows[dataset_id] = {
+                        "hdx_id": dataset_id,
+                        "hdx_stub": hapi_dataset_metadata["hdx_stub"],
+                        "title": hapi_dataset_metadata["title"],
+                        "hdx_provider_stub": hapi_dataset_metadata["hdx_provider_stub"],
+                        "hdx_provider_name": hapi_dataset_metadata["hdx_provider_name"],
+                    }
+                resource_id = resource["id"]
+                if resource_id in self._resource_ids:
+                    continue
+                hapi_resource_metadata = Read.get_hapi_resource_metadata(resource)
+                hapi_resource_metadata["dataset_hdx_id"] = dataset_id
+                hapi_resource_metadata["is_hxl"] = True
+                hapi_resource_metadata["hapi_updated_date"] = self._today
+                resource_rows[resource_id] = hapi_resource_metadata
+            self._add_rows(dataset_rows, resource_rows)
+
     def add_dataset_first_resource(self, dataset: Dataset) -> None:
         hapi_dataset_metadata = self.get_hapi_dataset_metadata(dataset)
         hapi_resource_metadata = Read.get_hapi_resource_metadata(dataset.get_resource())
         self.add_hapi_metadata(hapi_dataset_metadata, hapi_resource_metadata)
 
+    def has_resource(self, resource_id: str) -> bool:
+        """Whether a resource has been written in this run.
+
+        Args:
+            resource_id (str): Resource id
+
+        Returns:
+            bool: True if resource has been written in this run
+        """
+        return resource_id in self._resource_ids
+
     def get_dataset_name(self, dataset_id: str) -> Optional[str]:
         return self._dataset_id_to_name.get(dataset_id)
 
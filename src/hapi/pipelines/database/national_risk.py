@@ -8,10 +8,21 @@ from hdx.database import Database
 
 from . import locations
 from .base_uploader import BaseUploader
+from .bulk_loader import insert_rows
 from .metadata import Metadata
 
 logger = getLogger(__name__)
 
+_COLUMN_HXL_TAGS = {
+    "global_rank": "#risk+rank",
+    "overall_risk": "#risk+total",
+    "hazard_exposure_risk": "#risk+hazard",
+    "vulnerability_risk": "#risk+vulnerability",
+    "coping_capacity_risk": "#risk+coping+capacity",
+    "meta_missing_indicators_pct": "#meta+missing+indicators+pct",
+    "meta_avg_recentness_years": "#meta+recentness+avg",
+}
+
 
 class NationalRisk(BaseUploader):
     def __init__(
@@ -28,6 +39,7 @@ class NationalRisk(BaseUploader):
 
     def populate(self) -> None:
         logger.info("Populating national risk table")
+        rows = []
         for dataset in self._results.values():
             time_period_start = dataset["time_period"]["start"]
             time_period_end = dataset["time_period"]["end"]
@@ -36,42 +48,28 @@ class NationalRisk(BaseUploader):
                 hxl_tags = admin_results["headers"][1]
                 admin_codes = list(admin_results["values"][0].keys())
                 values = admin_results["values"]
+                # Look up the values of each column once per admin level
+                risk_classes = values[hxl_tags.index("#risk+class")]
+                columns = {
+                    column: values[hxl_tags.index(hxl_tag)]
+                    for column, hxl_tag in _COLUMN_HXL_TAGS.items()
+                }
 
                 for admin_code in admin_codes:
-                    risk_class = values[hxl_tags.index("#risk+class")].get(admin_code)
+                    risk_class = risk_classes.get(admin_code)
                     if risk_class:
                         risk_class = _get_risk_class_code_from_data(risk_class)
-
-                    national_risk_row = DBNationalRisk(
-                        resource_hdx_id=resource_id,
-                        location_ref=self._locations.data[admin_code],
-                        risk_class=risk_class,
-                        global_rank=values[hxl_tags.index("#risk+rank")].get(
-                            admin_code
-                        ),
-                        overall_risk=values[hxl_tags.index("#risk+total")].get(
-                            admin_code
-                        ),
-                        hazard_exposure_risk=values[hxl_tags.index("#risk+hazard")].get(
-                            admin_code
-                        ),
-                        vulnerability_risk=values[
-                            hxl_tags.index("#risk+vulnerability")
-                        ].get(admin_code),
-                        coping_capacity_risk=values[
-                            hxl_tags.index("#risk+coping+capacity")
-                        ].get(admin_code),
-                        meta_missing_indicators_pct=values[
-                            hxl_tags.index("#meta+missing+indicators+pct")
-                        ].get(admin_code),
-                        meta_avg_recentness_years=values[
-                            hxl_tags.index("#meta+recentness+avg")
-                        ].get(admin_code),
-                        reference_period_start=time_period_start,
-                        reference_period_end=time_period_end,
-                    )
-
-                    self._session.add(national_risk_row)
+                    row = {
+                        "resource_hdx_id": resource_id,
+                        "location_ref": self._locations.data[admin_code],
+                        "risk_class": risk_class,
+                    }
+                    for column, column_values in columns.items():
+                        row[column] = column_values.get(admin_code)
+                    row["reference_period_start"] = time_period_start
+                    row["reference_period_end"] = time_period_end
+                    rows.append(row)
+        insert_rows(self._session, DBNationalRisk, rows)
         self._session.commit()
 
 
@@ -1,20 +1,21 @@
 """Functions specific to the operational presence theme."""
 
 from logging import getLogger
-from typing import Dict
 
 from hapi_schema.db_operational_presence import DBOperationalPresence
 
+from .column_mapping import ColumnMapping
 from .hapi_subcategory_uploader import HapiSubcategoryUploader
 
 logger = getLogger(__name__)
 
 
 class OperationalPresence(HapiSubcategoryUploader):
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        output_row["org_acronym"] = row["org_acronym"] or ""
-        output_row["org_name"] = row["org_name"]
-        output_row["sector_code"] = row["sector_code"]
+    column_mappings = (
+        ColumnMapping("org_acronym", default="", encode=True),
+        ColumnMapping("org_name", encode=True),
+        ColumnMapping("sector_code", encode=True),
+    )
 
     def populate(self) -> None:
         self.hapi_populate(
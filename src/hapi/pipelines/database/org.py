@@ -5,9 +5,10 @@ from logging import getLogger
 from hapi_schema.db_org import DBOrg
 from hdx.api.configuration import Configuration
 from hdx.database import Database
-from hdx.scraper.framework.utilities.reader import Read
 
+from ..utilities.reader import get_reader, get_tabular_rows
 from .base_uploader import BaseUploader
+from .bulk_loader import insert_rows
 from .metadata import Metadata
 
 logger = getLogger(__name__)
@@ -26,22 +27,25 @@ class Org(BaseUploader):
 
     def populate(self) -> None:
         logger.info("Populating org table")
-        reader = Read.get_reader("hdx")
+        reader = get_reader("hdx")
         dataset = reader.read_dataset("hdx-hapi-organisations", self._configuration)
         self._metadata.add_dataset(dataset)
         resource = dataset.get_resource()
         url = resource["url"]
-        headers, rows = reader.get_tabular_rows(url, dict_form=True)
+        headers, rows = get_tabular_rows(url, "hdx", dict_form=True)
         # Acronym, Name, Org Type Code
+        org_rows = []
         for row in rows:
             acronym = row["acronym"] or ""
             # Ignore HXL row
             if acronym == "#org+acronym":
                 continue
-            org_row = DBOrg(
-                acronym=acronym,
-                name=row["name"],
-                org_type_code=row["org_type_code"],
+            org_rows.append(
+                {
+                    "acronym": acronym,
+                    "name": row["name"],
+                    "org_type_code": row["org_type_code"],
+                }
             )
-            self._session.add(org_row)
+        insert_rows(self._session, DBOrg, org_rows)
         self._session.commit()
@@ -7,6 +7,7 @@ from hdx.database import Database
 from hdx.scraper.framework.utilities.org_type import OrgType as OrgTypeData
 
 from .base_uploader import BaseUploader
+from .bulk_loader import insert_rows
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +22,9 @@ class OrgType(BaseUploader, OrgTypeData):
 
     def populate(self) -> None:
         logger.info("Populating org type table")
-        for code, description in self._code_to_name.items():
-            sector_row = DBOrgType(
-                code=code,
-                description=description,
-            )
-            self._session.add(sector_row)
+        rows = [
+            {"code": code, "description": description}
+            for code, description in self._code_to_name.items()
+        ]
+        insert_rows(self._session, DBOrgType, rows)
         self._session.commit()
@@ -1,22 +1,23 @@
 """Functions specific to the population theme."""
 
 from logging import getLogger
-from typing import Dict
 
 from hapi_schema.db_population import DBPopulation
 
+from .column_mapping import ColumnMapping
 from .hapi_subcategory_uploader import HapiSubcategoryUploader
 
 logger = getLogger(__name__)
 
 
 class Population(HapiSubcategoryUploader):
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        output_row["gender"] = row["gender"]
-        output_row["age_range"] = row["age_range"]
-        output_row["min_age"] = row["min_age"] and int(row["min_age"])
-        output_row["max_age"] = row["max_age"] and int(row["max_age"])
-        output_row["population"] = int(row["population"])
+    column_mappings = (
+        ColumnMapping("gender", encode=True),
+        ColumnMapping("age_range", encode=True),
+        ColumnMapping("min_age", coercion=int),
+        ColumnMapping("max_age", coercion=int),
+        ColumnMapping("population", coercion=int, required=True),
+    )
 
     def populate(self) -> None:
         self.hapi_populate(
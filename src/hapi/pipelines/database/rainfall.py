@@ -1,25 +1,26 @@
 """Functions specific to the rainfall theme."""
 
 from logging import getLogger
-from typing import Dict
 
 from hapi_schema.db_rainfall import DBRainfall
 
+from .column_mapping import ColumnMapping
 from .hapi_subcategory_uploader import HapiSubcategoryUploader
 
 logger = getLogger(__name__)
 
 
 class Rainfall(HapiSubcategoryUploader):
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        output_row["provider_admin1_code"] = row["provider_admin1_code"] or ""
-        output_row["provider_admin2_code"] = row["provider_admin2_code"] or ""
-        output_row["aggregation_period"] = row["aggregation_period"]
-        output_row["rainfall"] = row["rainfall"]
-        output_row["rainfall_long_term_average"] = row["rainfall_long_term_average"]
-        output_row["rainfall_anomaly_pct"] = row["rainfall_anomaly_pct"]
-        output_row["number_pixels"] = int(row["number_pixels"])
-        output_row["version"] = row["version"]
+    column_mappings = (
+        ColumnMapping("provider_admin1_code", default="", encode=True),
+        ColumnMapping("provider_admin2_code", default="", encode=True),
+        ColumnMapping("aggregation_period", encode=True),
+        ColumnMapping("rainfall"),
+        ColumnMapping("rainfall_long_term_average"),
+        ColumnMapping("rainfall_anomaly_pct"),
+        ColumnMapping("number_pixels", coercion=int, required=True),
+        ColumnMapping("version", encode=True),
+    )
 
     def populate(self) -> None:
         self.hapi_populate(
@@ -1,23 +1,24 @@
 """Functions specific to the returnees theme."""
 
 from logging import getLogger
-from typing import Dict
 
 from hapi_schema.db_returnees import DBReturnees
 
+from .column_mapping import ColumnMapping
 from .hapi_subcategory_uploader import HapiSubcategoryUploader
 
 logger = getLogger(__name__)
 
 
 class Returnees(HapiSubcategoryUploader):
-    def populate_row(self, output_row: Dict, row: Dict) -> None:
-        output_row["population_group"] = row["population_group"]
-        output_row["gender"] = row["gender"]
-        output_row["age_range"] = row["age_range"]
-        output_row["min_age"] = row["min_age"] and int(row["min_age"])
-        output_row["max_age"] = row["max_age"] and int(row["max_age"])
-        output_row["population"] = row["population"]
+    column_mappings = (
+        ColumnMapping("population_group", encode=True),
+        ColumnMapping("gender", encode=True),
+        ColumnMapping("age_range", encode=True),
+        ColumnMapping("min_age", coercion=int),
+        ColumnMapping("max_age", coercion=int),
+        ColumnMapping("population"),
+    )
 
     def populate(self) -> None:
         self.hapi_populate(
@@ -0,0 +1,189 @@
+"""Write rows to a database table in bounded chunks."""
+
+from logging import getLogger
+from operator import itemgetter
+from queue import Queue
+from threading import Thread
+from time import perf_counter
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from hapi_schema.utils.base import Base
+from hdx.database import Database
+from sqlalchemy.orm import Session
+
+from ..utilities.run_report import add_to_stage, get_current_stage
+from .bulk_loader import LOADERS_LITERAL, load_rows
+
+logger = getLogger(__name__)
+
+
+class RowWriter:
+    """Write rows to a table in chunks as they are added so that only a bounded
+    number of rows are held in memory. Chunks are written by a background
+    thread fed through a bounded queue so that downloading and parsing rows
+    overlaps with inserting them. The thread writes through its own
+    session on the engine of the given database as sessions cannot be
+    shared between threads. Use in a with statement or call close once
+    all rows are added. If chunk_size is None, all rows are held and written
+    when the writer is closed. Chunks are loaded with the given loader (see
+    load_rows). Rows written and time spent writing are added to the run
+    report stage current when the writer is created. If positional is True,
+    rows are held as tuples of their values in the column order of the table
+    rather than as dictionaries. The columns are those of the first row added
+    and all rows must have the same columns. The values of encoded_columns,
+    which should be columns with few distinct values, are dictionary encoded
+    as rows are added so that equal values share one object instead of each
+    row holding its own copy.
+
+    Args:
+        database (Database): Database
+        hapi_table (Type[Base]): Table to write to
+        chunk_size (Optional[int]): Rows per chunk. Defaults to 10000.
+        queue_size (int): Maximum chunks waiting to be written. Defaults to 2.
+        loader (LOADERS_LITERAL): Loader to use. Defaults to "insert".
+        positional (bool): Whether to hold rows as tuples. Defaults to False.
+        encoded_columns (Sequence[str]): Columns to encode. Defaults to ().
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        hapi_table: Type[Base],
+        chunk_size: Optional[int] = 10000,
+        queue_size: int = 2,
+        loader: LOADERS_LITERAL = "insert",
+        positional: bool = False,
+        encoded_columns: Sequence[str] = (),
+    ) -> None:
+        self._database = database
+        self._hapi_table = hapi_table
+        self._chunk_size = chunk_size
+        self._loader = loader
+        self._positional = positional
+        self._columns: Optional[List[str]] = None
+        self._get_values: Optional[Callable[[Mapping], Tuple]] = None
+        self._encodings = [(column, {}) for column in encoded_columns]
+        self._rows: List[Union[Dict, Tuple]] = []
+        self._queue: Queue = Queue(maxsize=queue_size)
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[Thread] = None
+        self._writer_session: Optional[Session] = None
+        self._stage = get_current_stage()
+        self.no_rows = 0
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._stop()
+
+    def _write(self, rows: List[Union[Dict, Tuple]]) -> None:
+        start = perf_counter()
+        load_rows(
+            self._writer_session, self._hapi_table, rows, self._loader, self._columns
+        )
+        add_to_stage("write_seconds", perf_counter() - start, self._stage)
+        add_to_stage("rows_out", len(rows), self._stage)
+
+    def _writer(self) -> None:
+        try:
+            self._writer_session = Session(self._database.get_engine())
+        except BaseException as ex:
+            self._error = ex
+        while True:
+            rows = self._queue.get()
+            if rows is None:
+                break
+            if self._error:
+                continue
+            try:
+                self._write(rows)
+            except BaseException as ex:
+                self._error = ex
+        if self._writer_session is not None:
+            self._writer_session.close()
+            self._writer_session = None
+
+    def _raise_error(self) -> None:
+        if self._error:
+            error = self._error
+            self._error = None
+            raise error
+
+    def _flush(self) -> None:
+        rows = self._rows
+        self._rows = []
+        if self._thread is None:
+            self._thread = Thread(
+                target=self._writer,
+                name=f"writer-{self._hapi_table.__tablename__}",
+                daemon=True,
+            )
+            self._thread.start()
+        self._queue.put(rows)
+
+    def _set_columns(self, row: Mapping) -> None:
+        self._columns = [
+            column.key
+            for column in self._hapi_table.__table__.columns
+            if column.key in row
+        ]
+        if len(self._columns) == 1:
+            column = self._columns[0]
+            self._get_values = lambda row: (row[column],)
+        else:
+            self._get_values = itemgetter(*self._columns)
+
+    def add(self, row: MutableMapping) -> None:
+        """Add row to be written. Values of encoded columns are replaced in
+        the row.
+
+        Args:
+            row (MutableMapping): Row to add
+
+        Returns:
+            None
+        """
+        self._raise_error()
+        for column, values in self._encodings:
+            value = row[column]
+            row[column] = values.setdefault(value, value)
+        if self._positional:
+            if self._get_values is None:
+                self._set_columns(row)
+            row = self._get_values(row)
+        self._rows.append(row)
+        self.no_rows += 1
+        if self._chunk_size and len(self._rows) >= self._chunk_size:
+            self._flush()
+
+    def _stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        """Write any remaining rows and wait for all writing to finish.
+
+        Returns:
+            None
+        """
+        if self._rows:
+            self._flush()
+        self._stop()
+        self._raise_error()
@@ -7,6 +7,7 @@ from hdx.database import Database
 from hdx.scraper.framework.utilities.sector import Sector as SectorData
 
 from .base_uploader import BaseUploader
+from .bulk_loader import insert_rows
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +22,8 @@ class Sector(BaseUploader, SectorData):
 
     def populate(self) -> None:
         logger.info("Populating sector table")
-        for code, name in self._code_to_name.items():
-            sector_row = DBSector(
-                code=code,
-                name=name,
-            )
-            self._session.add(sector_row)
+        rows = [
+            {"code": code, "name": name} for code, name in self._code_to_name.items()
+        ]
+        insert_rows(self._session, DBSector, rows)
         self._session.commit()
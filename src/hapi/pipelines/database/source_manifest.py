@@ -0,0 +1,192 @@
+"""Manifest of the source resources from which each theme was loaded."""
+
+import hashlib
+import logging
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Type
+
+from hapi_schema.utils.base import Base
+from hdx.api.configuration import Configuration
+from hdx.data.resource import Resource
+from hdx.database import Database
+from sqlalchemy import String, delete, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from ..utilities.reader import download_file, get_downloaded_path, get_reader
+
+logger = logging.getLogger(__name__)
+
+# Resource id to last modified date and content hash
+MANIFEST_ENTRIES = Dict[str, Tuple[Optional[str], Optional[str]]]
+
+
+class ManifestBase(DeclarativeBase):
+    """Base of the manifest table, which is kept out of the metadata of the
+    HAPI schema so that it is only created by incremental runs and is not
+    exported with the HAPI tables."""
+
+
+class DBSourceManifest(ManifestBase):
+    __tablename__ = "source_manifest"
+
+    theme: Mapped[str] = mapped_column(String(64), primary_key=True)
+    resource_hdx_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(String(32))
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64))
+
+
+def get_content_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class SourceManifest:
+    """Record the id, last modified date and content hash of each resource of
+    the HAPI datasets from which a theme is loaded so that an incremental run
+    can skip themes whose sources have not changed since they were loaded.
+    The manifest table is created if it does not exist.
+
+    Args:
+        database (Database): Database
+        configuration (Configuration): Configuration
+    """
+
+    def __init__(self, database: Database, configuration: Configuration) -> None:
+        ManifestBase.metadata.create_all(database.get_engine())
+        self._session = database.get_session()
+        self._configuration = configuration
+        self._lock = Lock()
+        self._entries: Dict[str, MANIFEST_ENTRIES] = {}
+        self._urls: Dict[str, str] = {}
+        for row in self._session.scalars(select(DBSourceManifest)):
+            self._entries.setdefault(row.theme, {})[row.resource_hdx_id] = (
+                row.last_modified,
+                row.content_hash,
+            )
+
+    def _get_resources(self, dataset_names: List[str]) -> Dict[str, Resource]:
+        reader = get_reader("hdx")
+        resources = {}
+        for dataset_name in dataset_names:
+            dataset = reader.read_dataset(dataset_name, self._configuration)
+            for resource in dataset.get_resources():
+                resources[resource["id"]] = resource
+        return resources
+
+    def get_changed_entries(
+        self, theme: str, dataset_names: List[str]
+    ) -> Optional[MANIFEST_ENTRIES]:
+        """Get the entries for the sources of a theme if they differ from
+        those last recorded for it, otherwise None. Resources whose last
+        modified date has changed are downloaded and hashed and if their
+        content hash matches the one recorded, they are treated as unchanged.
+        Downloaded files are reused when the theme is loaded. New resources
+        are not downloaded here so their hashes are left to be filled in from
+        the files downloaded to load them when the entries are recorded.
+
+        Args:
+            theme (str): Theme
+            dataset_names (List[str]): Names of HAPI datasets theme reads
+
+        Returns:
+            Optional[MANIFEST_ENTRIES]: Changed entries or None if unchanged
+        """
+        resources = self._get_resources(dataset_names)
+        recorded = self._entries.get(theme, {})
+        entries = {}
+        changed = recorded.keys() != resources.keys()
+        for resource_id, resource in resources.items():
+            with self._lock:
+                self._urls[resource_id] = resource["url"]
+            last_modified = resource.get("last_modified")
+            if resource_id not in recorded:
+                entries[resource_id] = (last_modified, None)
+                continue
+            recorded_last_modified, recorded_hash = recorded[resource_id]
+            if last_modified == recorded_last_modified:
+                entries[resource_id] = recorded[resource_id]
+                continue
+            path = download_file(resource["url"], "hdx")
+            content_hash = get_content_hash(path)
+            entries[resource_id] = (last_modified, content_hash)
+            if content_hash != recorded_hash:
+                changed = True
+        if changed:
+            return entries
+        if entries != recorded:
+            # Only last modified dates changed so record them
+            with self._lock:
+                self._write(self._session, theme, entries)
+                self._session.commit()
+        return None
+
+    def _write(self, session, theme: str, entries: MANIFEST_ENTRIES) -> None:
+        session.execute(delete(DBSourceManifest).filter_by(theme=theme))
+        session.add_all(
+            DBSourceManifest(
+                theme=theme,
+                resource_hdx_id=resource_id,
+                last_modified=last_modified,
+                content_hash=content_hash,
+            )
+            for resource_id, (last_modified, content_hash) in entries.items()
+        )
+        self._entries[theme] = entries
+
+    def clear(
+        self, database: Database, theme: str, hapi_tables: List[Type[Base]]
+    ) -> None:
+        """Delete the manifest entries of a theme and the rows of its tables.
+        Tables must be ordered so that those referencing others come first.
+
+        Args:
+            database (Database): Database
+            theme (str): Theme
+            hapi_tables (List[Type[Base]]): Tables of theme
+
+        Returns:
+            None
+        """
+        session = database.get_session()
+        session.execute(delete(DBSourceManifest).filter_by(theme=theme))
+        for hapi_table in hapi_tables:
+            logger.info(f"Clearing {hapi_table.__tablename__} table")
+            session.execute(delete(hapi_table))
+        session.commit()
+        with self._lock:
+            self._entries.pop(theme, None)
+
+    def _get_content_hash(self, resource_id: str) -> Optional[str]:
+        with self._lock:
+            url = self._urls.get(resource_id)
+        if url is None:
+            return None
+        path = get_downloaded_path(url, "hdx")
+        if path is None:
+            return None
+        return get_content_hash(path)
+
+    def record(self, database: Database, theme: str, entries: MANIFEST_ENTRIES):
+        """Record the entries for the sources from which a theme was loaded.
+        Missing content hashes are taken from the files downloaded to load the
+        theme, if any.
+
+        Args:
+            database (Database): Database
+            theme (str): Theme
+            entries (MANIFEST_ENTRIES): Entries for sources of theme
+
+        Returns:
+            None
+        """
+        entries = {
+            resource_id: (
+                last_modified,
+                content_hash or self._get_content_hash(resource_id),
+            )
+            for resource_id, (last_modified, content_hash) in entries.items()
+        }
+        session = database.get_session()
+        with self._lock:
+            self._write(session, theme, entries)
+            session.commit()
@@ -0,0 +1,178 @@
+"""Load into a staging schema and publish it in place of the live schema."""
+
+from logging import getLogger
+from typing import List
+
+from hapi_schema.utils.base import Base
+from sqlalchemy import Connection, Engine, create_engine, inspect, text
+from sqlalchemy.pool import NullPool
+
+logger = getLogger(__name__)
+
+# Privileges granted to roles other than the owner with the grantee quoted
+# (0 is PUBLIC)
+_SCHEMA_PRIVILEGES_SQL = """SELECT a.privilege_type,
+       coalesce(quote_ident(r.rolname), 'PUBLIC'), a.is_grantable
+FROM pg_namespace n
+CROSS JOIN aclexplode(n.nspacl) a
+LEFT JOIN pg_roles r ON r.oid = a.grantee
+WHERE n.nspname = :schema_name AND a.grantee <> n.nspowner"""
+
+# Privileges on tables, views and sequences that are also in the staging
+# schema
+_RELATION_PRIVILEGES_SQL = """SELECT quote_ident(c.relname),
+       CASE c.relkind WHEN 'S' THEN 'SEQUENCE' ELSE 'TABLE' END,
+       a.privilege_type, coalesce(quote_ident(r.rolname), 'PUBLIC'),
+       a.is_grantable
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+CROSS JOIN aclexplode(c.relacl) a
+LEFT JOIN pg_roles r ON r.oid = a.grantee
+WHERE n.nspname = :schema_name AND c.relkind IN ('r', 'p', 'v', 'm', 'S')
+  AND a.grantee <> c.relowner
+  AND EXISTS (
+    SELECT 1 FROM pg_class s
+    JOIN pg_namespace sn ON sn.oid = s.relnamespace
+    WHERE sn.nspname = :staging_name AND s.relname = c.relname
+  )"""
+
+_DEFAULT_PRIVILEGES_SQL = """SELECT quote_ident(pg_get_userbyid(d.defaclrole)),
+       d.defaclobjtype, a.privilege_type,
+       coalesce(quote_ident(r.rolname), 'PUBLIC'), a.is_grantable
+FROM pg_default_acl d
+JOIN pg_namespace n ON n.oid = d.defaclnamespace
+CROSS JOIN aclexplode(d.defaclacl) a
+LEFT JOIN pg_roles r ON r.oid = a.grantee
+WHERE n.nspname = :schema_name"""
+
+# Object types of default privileges that can be set per schema
+_DEFAULT_PRIVILEGE_OBJECTS = {
+    "r": "TABLES",
+    "S": "SEQUENCES",
+    "f": "FUNCTIONS",
+    "T": "TYPES",
+}
+
+
+def _get_grant(privilege: str, grantee: str, is_grantable: bool) -> str:
+    grant = f"GRANT {privilege} ON {{}} TO {grantee}"
+    if is_grantable:
+        grant += " WITH GRANT OPTION"
+    return grant
+
+
+class StagingSchema:
+    """Schema into which a full run is loaded while the live schema stays
+    readable, then published by renaming it to the live schema in one
+    transaction. The engine's connections resolve unqualified names in the
+    staging schema so tables and the views created with them by
+    prepare_hapi_views are created and loaded there. If unlogged is True,
+    tables are unlogged while they are loaded (skipping the write-ahead log)
+    and made logged again before they are published. The privileges granted
+    on the live schema, its tables and views and its default privileges are
+    granted on the staging schema when it is published. Only PostgreSQL is
+    supported.
+
+    Args:
+        db_uri (str): Database connection URI
+        schema_name (str): Live schema. Defaults to "public".
+        unlogged (bool): Whether tables are unlogged while loading. Defaults to True.
+    """
+
+    def __init__(
+        self, db_uri: str, schema_name: str = "public", unlogged: bool = True
+    ) -> None:
+        self.schema_name = schema_name
+        self.name = f"{schema_name}_staging"
+        self._unlogged = unlogged
+        self.engine: Engine = create_engine(
+            db_uri,
+            poolclass=NullPool,
+            connect_args={"options": f"-c search_path={self.name}"},
+        )
+        if self.engine.dialect.name != "postgresql":
+            raise ValueError(
+                f"Staging schemas are not supported by {self.engine.dialect.name}!"
+            )
+        self._quote = self.engine.dialect.identifier_preparer.quote
+
+    def _get_tables(self, connection: Connection) -> List[str]:
+        # Tables referenced by foreign keys come before those referencing them
+        table_names = set(inspect(connection).get_table_names(schema=self.name))
+        return [
+            f"{self._quote(self.name)}.{self._quote(table.name)}"
+            for table in Base.metadata.sorted_tables
+            if table.name in table_names
+        ]
+
+    def set_unlogged(self) -> None:
+        """Make the tables of the staging schema unlogged if configured to.
+        Tables should be empty.
+
+        Returns:
+            None
+        """
+        if not self._unlogged:
+            return
+        with self.engine.begin() as connection:
+            # Logged tables cannot reference unlogged ones
+            for table in reversed(self._get_tables(connection)):
+                connection.execute(text(f"ALTER TABLE {table} SET UNLOGGED"))
+
+    def _copy_privileges(self, connection: Connection) -> None:
+        # Schema, table and view privileges and default privileges belong to
+        # the live schema so would be dropped with it
+        parameters = {"schema_name": self.schema_name, "staging_name": self.name}
+        staging_name = self._quote(self.name)
+        grants = []
+        results = connection.execute(text(_SCHEMA_PRIVILEGES_SQL), parameters)
+        for privilege, grantee, is_grantable in results.all():
+            grant = _get_grant(privilege, grantee, is_grantable)
+            grants.append(grant.format(f"SCHEMA {staging_name}"))
+        results = connection.execute(text(_RELATION_PRIVILEGES_SQL), parameters)
+        for relation, object_type, privilege, grantee, is_grantable in results.all():
+            grant = _get_grant(privilege, grantee, is_grantable)
+            grants.append(grant.format(f"{object_type} {staging_name}.{relation}"))
+        results = connection.execute(text(_DEFAULT_PRIVILEGES_SQL), parameters)
+        for role, object_type, privilege, grantee, is_grantable in results.all():
+            objects = _DEFAULT_PRIVILEGE_OBJECTS.get(object_type)
+            if objects is None:
+                continue
+            grant = _get_grant(privilege, grantee, is_grantable)
+            grants.append(
+                f"ALTER DEFAULT PRIVILEGES FOR ROLE {role} IN SCHEMA {staging_name} {grant.format(objects)}"
+            )
+        for grant in grants:
+            connection.execute(text(grant))
+        if grants:
+            logger.info(f"Granted {len(grants)} privileges of {self.schema_name}")
+
+    def publish(self) -> None:
+        """Make the tables of the staging schema logged if they were made
+        unlogged and then in one transaction, grant the privileges of the live
+        schema on the staging schema, rename the live schema out of the way,
+        rename the staging schema to the live schema and drop the old live
+        schema. The views move with the tables.
+
+        Returns:
+            None
+        """
+        if self._unlogged:
+            logger.info(f"Making tables of {self.name} logged")
+            with self.engine.begin() as connection:
+                for table in self._get_tables(connection):
+                    connection.execute(text(f"ALTER TABLE {table} SET LOGGED"))
+        old_name = self._quote(f"{self.schema_name}_old")
+        schema_name = self._quote(self.schema_name)
+        with self.engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {old_name} CASCADE"))
+            if inspect(connection).has_schema(self.schema_name):
+                self._copy_privileges(connection)
+                connection.execute(
+                    text(f"ALTER SCHEMA {schema_name} RENAME TO {old_name}")
+                )
+            connection.execute(
+                text(f"ALTER SCHEMA {self._quote(self.name)} RENAME TO {schema_name}")
+            )
+            connection.execute(text(f"DROP SCHEMA {old_name} CASCADE"))
+        logger.info(f"Published {self.name} as {self.schema_name}")
@@ -10,5 +10,7 @@ logger = getLogger(__name__)
 
 
 class WFPCommodity(HapiBasicUploader):
+    encoded_columns = ("category",)
+
     def populate(self) -> None:
         self.hapi_populate(DBWFPCommodity)
@@ -15,6 +15,8 @@ logger = getLogger(__name__)
 
 
 class WFPMarket(HapiBasicUploader):
+    encoded_columns = ("provider_admin1_name", "provider_admin2_name")
+
     def __init__(
         self,
         database: Database,
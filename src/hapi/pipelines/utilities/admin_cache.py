@@ -0,0 +1,193 @@
+"""Disk cache of admin levels built from the global p-code datasets."""
+
+import hashlib
+import json
+import logging
+import pickle
+import re
+from importlib.metadata import version
+from os import makedirs, replace
+from os.path import exists, join
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hdx.api.configuration import Configuration
+from hdx.data.hdxobject import HDXError
+from hdx.data.resource import Resource
+from hdx.location.adminlevel import AdminLevel
+from hdx.utilities.typehint import ListTuple
+
+logger = logging.getLogger(__name__)
+
+# Increment when the cached structures change
+CACHE_VERSION = 1
+CACHE_FILENAME = "admin_levels.pkl"
+
+_RESOURCE_ID_REGEX = re.compile(r"/resource/([0-9a-f-]{36})/")
+
+
+def get_file_version(path: str) -> str:
+    """Get a version of a source file from a hash of its contents.
+
+    Args:
+        path (str): Path of source file
+
+    Returns:
+        str: Version of source file
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_resource_versions(
+    urls: ListTuple[str], configuration: Optional[Configuration] = None
+) -> Optional[List[str]]:
+    """Get versions of the HDX resources at the given urls from the last
+    modified dates in their HDX metadata, which unlike a hash of their
+    contents does not need the resources to be downloaded.
+
+    Args:
+        urls (ListTuple[str]): Urls of HDX resources
+        configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+
+    Returns:
+        Optional[List[str]]: Versions of resources or None if any could not be read
+    """
+    versions = []
+    for url in urls:
+        match = _RESOURCE_ID_REGEX.search(url)
+        if match is None:
+            return None
+        resource_id = match.group(1)
+        try:
+            resource = Resource.read_from_hdx(resource_id, configuration)
+        except HDXError as ex:
+            logger.warning(f"Could not read metadata of resource {resource_id}: {ex}")
+            return None
+        if resource is None or not resource.get("last_modified"):
+            return None
+        versions.append(f"{resource_id}|{resource['last_modified']}")
+    return versions
+
+
+def get_cache_key(
+    source_versions: ListTuple[str], admin_configs: ListTuple[Dict]
+) -> str:
+    """Get a key for the cache from the versions of the source files, the admin
+    configurations, the cache version and the version of the library that
+    builds the admin levels.
+
+    Args:
+        source_versions (ListTuple[str]): Versions of source files
+        admin_configs (ListTuple[Dict]): Admin configurations
+
+    Returns:
+        str: Cache key
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"{CACHE_VERSION}|{version('hdx-python-country')}".encode())
+    for source_version in source_versions:
+        hasher.update(f"|{source_version}".encode())
+    for admin_config in admin_configs:
+        hasher.update(json.dumps(admin_config, sort_keys=True, default=str).encode())
+    return hasher.hexdigest()
+
+
+def build_admin_levels(
+    admin1_config: Dict, admin2_config: Dict, admin_path: str, formats_path: str
+) -> Tuple[AdminLevel, AdminLevel]:
+    """Build admin one and admin two levels from the global p-codes and p-code
+    formats files.
+
+    Args:
+        admin1_config (Dict): Admin one configuration
+        admin2_config (Dict): Admin two configuration
+        admin_path (str): Path of global p-codes file
+        formats_path (str): Path of global p-code formats file
+
+    Returns:
+        Tuple[AdminLevel, AdminLevel]: Admin one and admin two levels
+    """
+    libhxl_dataset = AdminLevel.get_libhxl_dataset(url=admin_path).cache()
+    libhxl_format_dataset = AdminLevel.get_libhxl_dataset(url=formats_path).cache()
+    adminone = AdminLevel(admin_config=admin1_config, admin_level=1)
+    admintwo = AdminLevel(admin_config=admin2_config, admin_level=2)
+    adminone.setup_from_libhxl_dataset(libhxl_dataset)
+    adminone.load_pcode_formats_from_libhxl_dataset(libhxl_format_dataset)
+    admintwo.setup_from_libhxl_dataset(libhxl_dataset)
+    admintwo.load_pcode_formats_from_libhxl_dataset(libhxl_format_dataset)
+    admintwo.set_parent_admins_from_adminlevels([adminone])
+    return adminone, admintwo
+
+
+def _read_cache(path: str, key: str) -> Optional[Tuple[AdminLevel, AdminLevel]]:
+    if not exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            cache_version, cache_key, admin_levels = pickle.load(f)
+    except Exception:
+        logger.warning(f"Ignoring unreadable admin cache {path}")
+        return None
+    if cache_version != CACHE_VERSION or cache_key != key:
+        logger.info("Admin cache is out of date")
+        return None
+    return admin_levels
+
+
+def _write_cache(path: str, key: str, admin_levels: Tuple[AdminLevel, AdminLevel]):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(
+            (CACHE_VERSION, key, admin_levels), f, protocol=pickle.HIGHEST_PROTOCOL
+        )
+    replace(temp_path, path)
+
+
+def get_admin_levels(
+    configuration: Dict,
+    get_paths: Callable[[], Tuple[str, str]],
+    cache_folder: Optional[str] = None,
+    source_versions: Optional[ListTuple[str]] = None,
+) -> Tuple[AdminLevel, AdminLevel]:
+    """Get admin one and admin two levels loading them from the cache in
+    cache_folder if it was built from the same versions of the source files
+    and admin1 and admin2 configuration, otherwise building them and writing
+    them to the cache. If cache_folder is None, the admin levels are always
+    built. get_paths is called to get the paths of the global p-codes and
+    p-code formats files only when they are needed: to build the admin levels
+    or if source_versions is None, to get the versions from the contents of
+    the files.
+
+    Args:
+        configuration (Dict): Configuration with admin1 and admin2 sections
+        get_paths (Callable[[], Tuple[str, str]]): Function returning paths of global p-codes and p-code formats files
+        cache_folder (Optional[str]): Folder for cache. Defaults to None.
+        source_versions (Optional[ListTuple[str]]): Versions of source files. Defaults to None (from file contents).
+
+    Returns:
+        Tuple[AdminLevel, AdminLevel]: Admin one and admin two levels
+    """
+    admin1_config = configuration["admin1"]
+    admin2_config = configuration["admin2"]
+    if not cache_folder:
+        return build_admin_levels(admin1_config, admin2_config, *get_paths())
+    paths = None
+    if source_versions is None:
+        paths = get_paths()
+        source_versions = [get_file_version(path) for path in paths]
+    key = get_cache_key(source_versions, (admin1_config, admin2_config))
+    path = join(cache_folder, CACHE_FILENAME)
+    admin_levels = _read_cache(path, key)
+    if admin_levels:
+        logger.info(f"Loaded admin levels from cache {path}")
+        return admin_levels
+    if paths is None:
+        paths = get_paths()
+    admin_levels = build_admin_levels(admin1_config, admin2_config, *paths)
+    makedirs(cache_folder, exist_ok=True)
+    _write_cache(path, key, admin_levels)
+    logger.info(f"Wrote admin levels to cache {path}")
+    return admin_levels
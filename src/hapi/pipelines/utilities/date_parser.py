@@ -0,0 +1,40 @@
+"""Parse the dates of input rows quickly."""
+
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+from hdx.utilities.dateparse import parse_date
+
+_iso_date_regex = re.compile(r"(\d{4})-(\d{2})-(\d{2})", re.ASCII)
+
+# Distinct dates per run are few so this bounds memory without evictions
+CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_iso_date(string: Optional[str], max_time: bool = False) -> datetime:
+    """Parse a date string giving the same result as parse_date. Dates in
+    YYYY-MM-DD format, which is what HAPI input files use, are parsed
+    directly while anything else falls back to parse_date. Results are cached
+    as input files contain few distinct dates.
+
+    Args:
+        string (Optional[str]): Date string
+        max_time (bool): Whether to set time to 23:59:59. Defaults to False.
+
+    Returns:
+        datetime: Date with timezone UTC
+    """
+    if string is not None:
+        match = _iso_date_regex.fullmatch(string)
+        if match:
+            year, month, day = (int(value) for value in match.groups())
+            try:
+                if max_time:
+                    return datetime(year, month, day, 23, 59, 59, tzinfo=timezone.utc)
+                return datetime(year, month, day, tzinfo=timezone.utc)
+            except ValueError:
+                pass
+    return parse_date(string, max_time=max_time)
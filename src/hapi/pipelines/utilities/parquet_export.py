@@ -0,0 +1,238 @@
+"""Export the HAPI views of a PostgreSQL database to Parquet."""
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from logging import getLogger
+from operator import itemgetter
+from os import makedirs
+from os.path import join, relpath
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from psycopg import adapters, sql
+from sqlalchemy import Engine
+
+from .view_export import get_view_names
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = getLogger(__name__)
+
+PARTITION_COLUMN = "location_code"
+# Name pyarrow gives partitions of null values
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Highest precision of Arrow decimal128
+MAX_DECIMAL_PRECISION = 38
+
+# Column name, Arrow type and conversion of non-null values
+COLUMN = Tuple[str, Any, Optional[Callable[[Any], Any]]]
+
+
+def _get_column(
+    name: str,
+    type_name: str,
+    precision: Optional[int] = None,
+    scale: Optional[int] = None,
+) -> COLUMN:
+    if type_name in ("int2", "int4", "int8"):
+        return name, pa.int64(), None
+    if type_name in ("float4", "float8"):
+        return name, pa.float64(), None
+    if type_name == "numeric":
+        # Keep exact values: numeric without a precision or with one too
+        # high for decimal128 is written as text
+        if precision is not None and precision <= MAX_DECIMAL_PRECISION:
+            return name, pa.decimal128(precision, scale or 0), None
+        return name, pa.string(), str
+    if type_name == "bool":
+        return name, pa.bool_(), None
+    if type_name == "date":
+        return name, pa.date32(), None
+    if type_name == "timestamp":
+        return name, pa.timestamp("us"), None
+    if type_name == "timestamptz":
+        return name, pa.timestamp("us", tz="UTC"), None
+    # Text, enums and anything else
+    return name, pa.string(), str
+
+
+def _to_record_batch(rows: List[Tuple], columns: List[COLUMN]) -> "pa.RecordBatch":
+    arrays = []
+    for values, (_, arrow_type, convert) in zip(zip(*rows), columns):
+        if convert is not None:
+            values = [value if value is None else convert(value) for value in values]
+        arrays.append(pa.array(values, type=arrow_type))
+    return pa.RecordBatch.from_arrays(arrays, names=[column[0] for column in columns])
+
+
+def _get_file_hash(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def write_parquet(
+    batches: Iterable[List[Tuple]],
+    columns: List[COLUMN],
+    folder: str,
+    partition_column: Optional[str] = None,
+) -> Dict:
+    """Write batches of rows to zstd compressed Parquet files under folder.
+    If partition_column is given, rows must be sorted by it and each of its
+    values is written to data.parquet in its own <column>=<value> folder,
+    otherwise all rows go to data.parquet. Only one batch and one file are
+    open at a time.
+
+    Args:
+        batches (Iterable[List[Tuple]]): Batches of rows
+        columns (List[COLUMN]): Names, Arrow types and conversions of columns
+        folder (str): Folder to write to
+        partition_column (Optional[str]): Column to partition by. Defaults to None.
+
+    Returns:
+        Dict: Manifest entry with total rows and rows and hash of each file
+    """
+    if pa is None:
+        raise ImportError(
+            "pyarrow not found! Please install hapi-pipelines[parquet] to enable."
+        )
+    schema = pa.schema([(name, arrow_type) for name, arrow_type, _ in columns])
+    files = {}
+    writer = None
+    path = None
+
+    def close_writer():
+        if writer is not None:
+            writer.close()
+            files[relpath(path, folder)]["sha256"] = _get_file_hash(path)
+
+    if partition_column is None:
+        get_partition = None
+        partition = None
+    else:
+        get_partition = itemgetter(
+            [column[0] for column in columns].index(partition_column)
+        )
+        partition = object()
+    try:
+        for batch in batches:
+            if get_partition is None:
+                runs = ((None, batch),)
+            else:
+                runs = groupby(batch, key=get_partition)
+            for value, rows in runs:
+                rows = list(rows)
+                if writer is None or value != partition:
+                    close_writer()
+                    partition = value
+                    if get_partition is None:
+                        partition_folder = folder
+                    else:
+                        if value is None:
+                            value = NULL_PARTITION
+                        partition_folder = join(folder, f"{partition_column}={value}")
+                    makedirs(partition_folder, exist_ok=True)
+                    path = join(partition_folder, "data.parquet")
+                    writer = pq.ParquetWriter(path, schema, compression="zstd")
+                    files[relpath(path, folder)] = {"rows": 0}
+                writer.write_batch(_to_record_batch(rows, columns))
+                files[relpath(path, folder)]["rows"] += len(rows)
+        if writer is None:
+            # Write an empty file so the schema is still available
+            makedirs(folder, exist_ok=True)
+            path = join(folder, "data.parquet")
+            writer = pq.ParquetWriter(path, schema, compression="zstd")
+            files[relpath(path, folder)] = {"rows": 0}
+    finally:
+        close_writer()
+    return {
+        "rows": sum(file["rows"] for file in files.values()),
+        "files": files,
+    }
+
+
+def export_view_parquet(
+    engine: Engine, view: str, folder: str, batch_size: int = 10000
+) -> Dict:
+    """Stream a view through a server side cursor in batches of rows into
+    Parquet files in a <view> folder under folder, partitioned by
+    location_code if the view has that column. Rows are ordered by all the
+    columns of the view, location_code first, so that the files written for
+    the same data are the same.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        view (str): Name of view
+        folder (str): Folder to write to
+        batch_size (int): Rows per batch. Defaults to 10000.
+
+    Returns:
+        Dict: Manifest entry with total rows and rows and hash of each file
+    """
+    with engine.connect() as connection:
+        driver_connection = connection.connection.driver_connection
+        with driver_connection.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("SELECT * FROM {} LIMIT 0").format(sql.Identifier(view))
+            )
+            names = [column.name for column in cursor.description]
+        if PARTITION_COLUMN in names:
+            partition_column = PARTITION_COLUMN
+            names.remove(PARTITION_COLUMN)
+            names.insert(0, PARTITION_COLUMN)
+        else:
+            partition_column = None
+        statement = sql.SQL("SELECT * FROM {} ORDER BY {}").format(
+            sql.Identifier(view), sql.SQL(", ").join(map(sql.Identifier, names))
+        )
+        with driver_connection.cursor(name=f"export_{view}") as cursor:
+            cursor.execute(statement)
+            columns = []
+            for column in cursor.description:
+                type_info = adapters.types.get(column.type_code)
+                type_name = type_info.name if type_info else "text"
+                columns.append(
+                    _get_column(column.name, type_name, column.precision, column.scale)
+                )
+            batches = iter(lambda: cursor.fetchmany(batch_size), [])
+            entry = write_parquet(
+                batches, columns, join(folder, view), partition_column
+            )
+        driver_connection.commit()
+    logger.info(f"Exported {view} to Parquet")
+    return entry
+
+
+def export_views_parquet(engine: Engine, folder: str, workers: int = 4) -> Dict:
+    """Export every view in the schemas of the search path to Parquet under
+    folder, several views at a time each over its own connection, and write
+    a manifest.json of the rows and hashes of the files of each view.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        folder (str): Folder to write to
+        workers (int): Number of views exported concurrently. Defaults to 4.
+
+    Returns:
+        Dict: Manifest of view name to rows and files
+    """
+    makedirs(folder, exist_ok=True)
+    with engine.connect() as connection:
+        views = get_view_names(connection)
+    with ThreadPoolExecutor(
+        max_workers=max(workers, 1), thread_name_prefix="export"
+    ) as executor:
+        futures = {
+            view: executor.submit(export_view_parquet, engine, view, folder)
+            for view in views
+        }
+        manifest = {view: future.result() for view, future in futures.items()}
+    with open(join(folder, "manifest.json"), "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
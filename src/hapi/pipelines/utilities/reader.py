@@ -0,0 +1,326 @@
+"""Readers that can be used from threads other than the main one."""
+
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from os.path import exists, getsize, isfile
+from queue import Full, Queue
+from threading import Event, Lock, current_thread, local, main_thread
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from weakref import WeakKeyDictionary
+
+from hdx.scraper.framework.utilities.reader import Read
+from hdx.utilities.downloader import Download
+from ratelimit import RateLimitDecorator, sleep_and_retry
+
+from .run_report import Stage, add_to_stage, get_current_stage, use_stage
+
+_local = local()
+_done = object()
+_rate_limiters = WeakKeyDictionary()
+_rate_limiters_lock = Lock()
+_downloads = WeakKeyDictionary()
+_downloads_lock = Lock()
+
+# Same as the default of Read.create_readers
+RATE_LIMIT = {"calls": 1, "period": 0.1}
+
+
+def _get_rate_limiter(downloader: Download) -> RateLimitDecorator:
+    """Get the rate limiter of a downloader. The first time it is called for
+    a downloader, the downloader is set up to use a new rate limiter.
+
+    Args:
+        downloader (Download): Downloader
+
+    Returns:
+        RateLimitDecorator: Rate limiter of downloader
+    """
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(downloader)
+        if rate_limiter is None:
+            rate_limiter = RateLimitDecorator(**RATE_LIMIT)
+            _set_rate_limiter(downloader, rate_limiter)
+        return rate_limiter
+
+
+def _set_rate_limiter(downloader: Download, rate_limiter: RateLimitDecorator) -> None:
+    downloader.setup = sleep_and_retry(rate_limiter(downloader.normal_setup))
+    _rate_limiters[downloader] = rate_limiter
+
+
+class InstrumentedRead(Read):
+    """Reader that adds the size of and time taken by each file it downloads
+    to the current stage of the thread using it. Readers generated with
+    create_readers are registered as those of Read so that they are the ones
+    returned by Read.get_reader.
+    """
+
+    @classmethod
+    def create_readers(cls, *args: Any, **kwargs: Any) -> None:
+        """Generate readers as Read.create_readers does.
+
+        Args:
+            *args (Any): Positional arguments of Read.create_readers
+            **kwargs (Any): Keyword arguments of Read.create_readers
+
+        Returns:
+            None
+        """
+        super().create_readers(*args, **kwargs)
+        Read.retrievers = cls.retrievers
+
+    def download_file(self, *args: Any, **kwargs: Any) -> str:
+        start = perf_counter()
+        path = super().download_file(*args, **kwargs)
+        add_to_stage("download_seconds", perf_counter() - start)
+        if isfile(path):
+            add_to_stage("bytes_downloaded", getsize(path))
+        return path
+
+
+def get_reader(name: Optional[str] = None) -> Read:
+    """Get a generated reader given a name for use in the current thread. A
+    downloader holds the response it is reading so it cannot be shared between
+    threads. In threads other than the main thread, a copy of the reader is
+    returned that has its own downloader sharing the session and rate limiter
+    of the original, so the rate limit holds across all threads together.
+
+    Args:
+        name (Optional[str]): Name of reader. Defaults to None (get default).
+
+    Returns:
+        Read: Reader object
+    """
+    reader = Read.get_reader(name)
+    if current_thread() is main_thread():
+        return reader
+    readers = getattr(_local, "readers", None)
+    if readers is None:
+        readers = _local.readers = {}
+    original, thread_reader = readers.get(name, (None, None))
+    if original is not reader:
+        rate_limiter = _get_rate_limiter(reader.downloader)
+        thread_reader = copy(reader)
+        thread_reader.downloader = Download(session=reader.downloader.session)
+        with _rate_limiters_lock:
+            _set_rate_limiter(thread_reader.downloader, rate_limiter)
+        readers[name] = reader, thread_reader
+    return thread_reader
+
+
+class Row:
+    """Row of a tabular file held as a list of values along with the mapping
+    of header to index shared by all rows of the file, which avoids building
+    a dictionary per row. Values can be got and set by header as with a
+    dictionary.
+
+    Args:
+        values (List): Values of row
+        indices (Dict[str, int]): Header to index of value
+    """
+
+    __slots__ = ("values", "indices")
+
+    def __init__(self, values: List, indices: Dict[str, int]) -> None:
+        self.values = values
+        self.indices = indices
+
+    def __getitem__(self, header: str) -> Any:
+        return self.values[self.indices[header]]
+
+    def __setitem__(self, header: str, value: Any) -> None:
+        self.values[self.indices[header]] = value
+
+    def __contains__(self, header: str) -> bool:
+        return header in self.indices
+
+    def get(self, header: str, default: Any = None) -> Any:
+        index = self.indices.get(header)
+        if index is None:
+            return default
+        return self.values[index]
+
+    def keys(self) -> Iterator[str]:
+        return iter(self.indices)
+
+
+def _get_downloads(name: Optional[str]) -> Dict[str, str]:
+    # Keyed by the generated reader so that downloads do not outlive the
+    # readers of a run
+    reader = Read.get_reader(name)
+    with _downloads_lock:
+        downloads = _downloads.get(reader)
+        if downloads is None:
+            downloads = _downloads[reader] = {}
+        return downloads
+
+
+def download_file(url: str, name: Optional[str] = None) -> str:
+    """Download a file with a generated reader given a name unless it was
+    already downloaded by this function with the same generated readers, in
+    which case the existing file is used. This means a file downloaded to
+    check whether it changed is not downloaded again to be read.
+
+    Args:
+        url (str): Url of file
+        name (Optional[str]): Name of reader. Defaults to None (get default).
+
+    Returns:
+        str: Path of file
+    """
+    downloads = _get_downloads(name)
+    with _downloads_lock:
+        path = downloads.get(url)
+    if path is None or not exists(path):
+        path = get_reader(name).download_file(url)
+        with _downloads_lock:
+            downloads[url] = path
+    return path
+
+
+def get_downloaded_path(url: str, name: Optional[str] = None) -> Optional[str]:
+    """Get the path of a file downloaded by download_file with the current
+    generated readers.
+
+    Args:
+        url (str): Url of file
+        name (Optional[str]): Name of reader. Defaults to None (get default).
+
+    Returns:
+        Optional[str]: Path of file or None if it was not downloaded
+    """
+    downloads = _get_downloads(name)
+    with _downloads_lock:
+        path = downloads.get(url)
+    if path is None or not exists(path):
+        return None
+    return path
+
+
+def get_tabular_rows(
+    url: str, name: Optional[str] = None, dict_form: bool = False
+) -> Tuple[List[str], Iterator[Union[List, Dict]]]:
+    """Get the headers and rows of a tabular file as Read.get_tabular_rows
+    does, downloading the file with download_file.
+
+    Args:
+        url (str): Url of file
+        name (Optional[str]): Name of reader. Defaults to None (get default).
+        dict_form (bool): Whether to return dictionaries. Defaults to False.
+
+    Returns:
+        Tuple[List[str], Iterator[Union[List, Dict]]]: Headers and rows
+    """
+    path = download_file(url, name)
+    return get_reader(name).downloader.get_tabular_rows(path, dict_form=dict_form)
+
+
+def _get_rows(
+    url: str, name: Optional[str], dict_form: bool
+) -> Iterator[Union[Dict, Row]]:
+    headers, rows = get_tabular_rows(url, name, dict_form)
+    if dict_form:
+        return rows
+    indices = {header: i for i, header in enumerate(headers)}
+    return (Row(values, indices) for values in rows)
+
+
+def _put(rows_queue: Queue, item: Any, stop: Event) -> bool:
+    while not stop.is_set():
+        try:
+            rows_queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _read_rows(
+    url: str,
+    name: Optional[str],
+    rows_queue: Queue,
+    stop: Event,
+    chunk_size: int,
+    stage: Optional[Stage],
+    dict_form: bool,
+) -> None:
+    if stop.is_set():
+        return
+    with use_stage(stage):
+        try:
+            rows = _get_rows(url, name, dict_form)
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    if not _put(rows_queue, chunk, stop):
+                        return
+                    chunk = []
+            if chunk and not _put(rows_queue, chunk, stop):
+                return
+            _put(rows_queue, _done, stop)
+        except BaseException as ex:
+            _put(rows_queue, ex, stop)
+
+
+def iterate_tabular_rows(
+    urls: List[str],
+    name: Optional[str] = None,
+    workers: int = 1,
+    queue_size: int = 4,
+    chunk_size: int = 1000,
+    dict_form: bool = True,
+) -> Iterator[Union[Dict, Row]]:
+    """Iterate over the rows of the tabular files at the given urls in order
+    as dictionaries or if dict_form is False, as Row objects which resolve
+    headers to positions once per file. With more than one worker, files are downloaded and
+    parsed concurrently by a pool of worker threads each feeding the chunks of
+    rows of one file into a bounded queue. Rows are still yielded and any
+    exception raised in the order of the urls, so the result is the same as
+    reading the files one after another.
+
+    Args:
+        urls (List[str]): Urls of files
+        name (Optional[str]): Name of reader. Defaults to None (get default).
+        workers (int): Number of files to read concurrently. Defaults to 1.
+        queue_size (int): Maximum chunks held per file. Defaults to 4.
+        chunk_size (int): Rows per chunk. Defaults to 1000.
+        dict_form (bool): Whether to return dictionaries. Defaults to True.
+
+    Returns:
+        Iterator[Union[Dict, Row]]: Rows of files
+    """
+    if workers <= 1 or len(urls) <= 1:
+        for url in urls:
+            yield from _get_rows(url, name, dict_form)
+        return
+    stop = Event()
+    stage = get_current_stage()
+    rows_queues = [Queue(maxsize=queue_size) for _ in urls]
+    # Files are submitted in order so the earliest file not yet read always
+    # has a worker
+    executor = ThreadPoolExecutor(max_workers=min(workers, len(urls)))
+    try:
+        for url, rows_queue in zip(urls, rows_queues):
+            executor.submit(
+                _read_rows,
+                url,
+                name,
+                rows_queue,
+                stop,
+                chunk_size,
+                stage,
+                dict_form,
+            )
+        for rows_queue in rows_queues:
+            while True:
+                item = rows_queue.get()
+                if item is _done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield from item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
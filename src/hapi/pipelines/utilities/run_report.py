@@ -0,0 +1,224 @@
+"""Record how long each stage of a run takes and what it reads and writes."""
+
+import json
+import logging
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from threading import Lock, local
+from time import perf_counter, process_time, thread_time
+from typing import Dict, Iterator, List, Optional, Union
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_current = local()
+
+
+class Stage:
+    """Counters of a stage of a run eg. rows_in, rows_out, bytes_downloaded,
+    download_seconds and write_seconds. Counters can be added to from any
+    thread.
+
+    Args:
+        name (str): Name of stage
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.counters: Dict[str, Union[int, float]] = {}
+        self._lock = Lock()
+
+    def add(self, key: str, value: Union[int, float]) -> None:
+        """Add value to counter.
+
+        Args:
+            key (str): Counter
+            value (Union[int, float]): Value to add
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+def get_current_stage() -> Optional[Stage]:
+    """Get the innermost stage running in this thread.
+
+    Returns:
+        Optional[Stage]: Current stage or None if no stage is running
+    """
+    stages = getattr(_current, "stages", None)
+    if stages:
+        return stages[-1]
+    return None
+
+
+@contextmanager
+def use_stage(stage: Optional[Stage]) -> Iterator[None]:
+    """Context manager that makes a stage started in another thread the
+    current stage of this thread so that work done on its behalf eg. by
+    helper threads is added to it. Does nothing if stage is None.
+
+    Args:
+        stage (Optional[Stage]): Stage
+
+    Returns:
+        Iterator[None]
+    """
+    if stage is None:
+        yield
+        return
+    stages = getattr(_current, "stages", None)
+    if stages is None:
+        stages = _current.stages = []
+    stages.append(stage)
+    try:
+        yield
+    finally:
+        stages.pop()
+
+
+def add_to_stage(
+    key: str, value: Union[int, float], stage: Optional[Stage] = None
+) -> None:
+    """Add value to a counter of the given stage or if None, the current stage
+    of this thread. Does nothing if there is no stage.
+
+    Args:
+        key (str): Counter
+        value (Union[int, float]): Value to add
+        stage (Optional[Stage]): Stage. Defaults to None (current stage).
+
+    Returns:
+        None
+    """
+    if stage is None:
+        stage = get_current_stage()
+    if stage is not None:
+        stage.add(key, value)
+
+
+def _get_peak_rss() -> Optional[int]:
+    # resource is only available on Unix
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak_rss
+    return peak_rss * 1024
+
+
+class RunReport:
+    """Report of the stages of a run. Each stage records wall time, the CPU
+    time of the thread running it (thread_cpu_seconds), the counters added to
+    it and peak memory. The thread CPU time of a stage leaves out helper
+    threads working for it eg. row writers and resource readers, and
+    process-wide CPU time would include other stages running at the same time,
+    so the CPU time of the whole process is only given for the run
+    (cpu_seconds). Peak RSS is that of the process so far and is omitted on
+    platforms without the resource module. Peak traced memory (only if
+    trace_memory is True) includes any stages running at the same time.
+
+    Args:
+        trace_memory (bool): Whether to trace memory with tracemalloc. Defaults to False.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self._trace_memory = trace_memory
+        self._stages: List[Dict] = []
+        self._running = 0
+        self._lock = Lock()
+        self._started = datetime.now(timezone.utc)
+        self._start_wall = perf_counter()
+        self._start_cpu = process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        """Context manager that records a stage of the run.
+
+        Args:
+            name (str): Name of stage
+
+        Returns:
+            Iterator[Stage]: Stage to which counters can be added
+        """
+        stage = Stage(name)
+        stages = getattr(_current, "stages", None)
+        if stages is None:
+            stages = _current.stages = []
+        with self._lock:
+            if self._trace_memory and self._running == 0:
+                tracemalloc.reset_peak()
+            self._running += 1
+        started = datetime.now(timezone.utc)
+        start_wall = perf_counter()
+        start_cpu = thread_time()
+        stages.append(stage)
+        succeeded = False
+        try:
+            yield stage
+            succeeded = True
+        finally:
+            stages.pop()
+            result = {
+                "name": name,
+                "started": started.isoformat(),
+                "succeeded": succeeded,
+                "wall_seconds": perf_counter() - start_wall,
+                "thread_cpu_seconds": thread_time() - start_cpu,
+            }
+            result.update(stage.counters)
+            peak_rss = _get_peak_rss()
+            if peak_rss is not None:
+                result["peak_rss_bytes"] = peak_rss
+            with self._lock:
+                if self._trace_memory:
+                    result["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+                self._running -= 1
+                self._stages.append(result)
+            logger.info(
+                f"Stage {name} took {result['wall_seconds']:.2f}s "
+                f"({result['thread_cpu_seconds']:.2f}s thread CPU)"
+            )
+
+    def get_report(self) -> Dict:
+        """Get report of run so far.
+
+        Returns:
+            Dict: Report of run
+        """
+        with self._lock:
+            stages = list(self._stages)
+        report = {
+            "started": self._started.isoformat(),
+            "wall_seconds": perf_counter() - self._start_wall,
+            "cpu_seconds": process_time() - self._start_cpu,
+        }
+        peak_rss = _get_peak_rss()
+        if peak_rss is not None:
+            report["peak_rss_bytes"] = peak_rss
+        report["stages"] = stages
+        return report
+
+    def write(self, path: str) -> None:
+        """Write report of run to JSON file.
+
+        Args:
+            path (str): Path of JSON file
+
+        Returns:
+            None
+        """
+        with open(path, "w") as f:
+            json.dump(self.get_report(), f, indent=2)
+        logger.info(f"Wrote run report to {path}")
@@ -0,0 +1,92 @@
+"""Export a HAPI database to a single SQLite file."""
+
+from logging import getLogger
+from os import makedirs, remove, replace
+from os.path import dirname, exists
+from typing import Dict
+
+from hapi_schema.utils.base import Base
+from hapi_schema.views import prepare_hapi_views
+from sqlalchemy import Engine, create_engine, insert, inspect, select
+from sqlalchemy.pool import NullPool
+
+logger = getLogger(__name__)
+
+# The file is written once by a single connection and only renamed into place
+# when complete so it needs no journal, syncing or locking by other readers
+_LOAD_PRAGMAS = (
+    "PRAGMA page_size = 16384",
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+)
+
+
+def export_sqlite(engine: Engine, path: str, batch_size: int = 10000) -> Dict[str, int]:
+    """Export the HAPI tables and views of a database to a new SQLite file.
+    The file is built under a temporary name with PRAGMAs tuned for bulk
+    loading, all tables are loaded in one transaction before their non-unique
+    indexes are created, statistics are gathered with ANALYZE and then the
+    file is renamed to path replacing any existing file.
+
+    Args:
+        engine (Engine): SQLAlchemy engine of database to export
+        path (str): Path of SQLite file
+        batch_size (int): Rows read and inserted at a time. Defaults to 10000.
+
+    Returns:
+        Dict[str, int]: Table name to number of rows
+    """
+    folder = dirname(path)
+    if folder:
+        makedirs(folder, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    if exists(temp_path):
+        remove(temp_path)
+    # Registers the creation of the views with the metadata
+    prepare_hapi_views()
+    sqlite_engine = create_engine(f"sqlite:///{temp_path}", poolclass=NullPool)
+    row_counts = {}
+    try:
+        with (
+            engine.connect() as source,
+            sqlite_engine.connect() as target,
+        ):
+            for pragma in _LOAD_PRAGMAS:
+                target.exec_driver_sql(pragma)
+            table_names = set(inspect(source).get_table_names())
+            tables = [
+                table
+                for table in Base.metadata.sorted_tables
+                if table.name in table_names
+            ]
+            Base.metadata.create_all(target, tables=tables)
+            indexes = [
+                index for table in tables for index in table.indexes if not index.unique
+            ]
+            for index in indexes:
+                index.drop(target)
+            target.commit()
+            for table in tables:
+                result = source.execution_options(yield_per=batch_size).execute(
+                    select(table)
+                )
+                row_count = 0
+                for rows in result.mappings().partitions():
+                    target.execute(insert(table), rows)
+                    row_count += len(rows)
+                row_counts[table.name] = row_count
+                logger.info(f"Exported {row_count} rows of {table.name}")
+            target.commit()
+            for index in indexes:
+                index.create(target)
+            target.exec_driver_sql("ANALYZE")
+            target.commit()
+            target.exec_driver_sql("PRAGMA journal_mode = DELETE")
+    finally:
+        sqlite_engine.dispose()
+    replace(temp_path, path)
+    logger.info(f"Exported {len(row_counts)} tables and their views to {path}")
+    return row_counts
@@ -0,0 +1,157 @@
+"""Run pipeline tasks in dependency order, optionally on a worker pool."""
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from copy import copy
+from threading import local
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hdx.database import Database
+from hdx.utilities.typehint import ListTuple
+from sqlalchemy.orm import Session
+
+from .run_report import RunReport
+
+logger = logging.getLogger(__name__)
+
+
+class ThemeScheduler:
+    """Run tasks once all the tasks they depend on have completed. Each task
+    is a function that takes the Database it should write with. With one
+    worker, tasks run serially in the order they were added (subject to their
+    dependencies) using the supplied database. With more workers, tasks run
+    concurrently on a thread pool where each worker thread writes through a
+    copy of the supplied database with its own session on the same engine. If
+    a run report is given, each task is recorded as a stage of it.
+
+    Args:
+        database (Database): Database
+        workers (int): Number of worker threads. Defaults to 1.
+        run_report (Optional[RunReport]): Run report. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        workers: int = 1,
+        run_report: Optional[RunReport] = None,
+    ) -> None:
+        self._database = database
+        self._workers = workers
+        self._run_report = run_report
+        self._tasks: Dict[str, Callable[[Database], None]] = {}
+        self._dependencies: Dict[str, Tuple[str, ...]] = {}
+        self._local = local()
+        self._worker_databases: List[Database] = []
+
+    def add_task(
+        self,
+        name: str,
+        function: Callable[[Database], None],
+        dependencies: ListTuple[str] = (),
+    ) -> None:
+        """Add a task that will only be run after the tasks it depends on.
+
+        Args:
+            name (str): Name of task
+            function (Callable[[Database], None]): Function to run
+            dependencies (ListTuple[str]): Names of tasks that must complete first. Defaults to ().
+
+        Returns:
+            None
+        """
+        if name in self._tasks:
+            raise ValueError(f"Task {name} has already been added!")
+        self._tasks[name] = function
+        self._dependencies[name] = tuple(dependencies)
+
+    def get_order(self) -> List[str]:
+        """Get an order in which the tasks can be run serially. Tasks keep the
+        order in which they were added unless a dependency requires otherwise.
+
+        Returns:
+            List[str]: Task names in run order
+        """
+        for name, dependencies in self._dependencies.items():
+            for dependency in dependencies:
+                if dependency not in self._tasks:
+                    raise ValueError(
+                        f"Task {name} depends on unknown task {dependency}!"
+                    )
+        order = []
+        done = set()
+        remaining = list(self._tasks)
+        while remaining:
+            for name in remaining:
+                if all(dependency in done for dependency in self._dependencies[name]):
+                    break
+            else:
+                raise ValueError(
+                    f"Circular dependency between tasks: {', '.join(remaining)}!"
+                )
+            remaining.remove(name)
+            done.add(name)
+            order.append(name)
+        return order
+
+    def _get_worker_database(self) -> Database:
+        database = getattr(self._local, "database", None)
+        if database is None:
+            # Constructing a Database would create tables and views again
+            database = copy(self._database)
+            database._session = Session(self._database.get_engine())
+            self._local.database = database
+            self._worker_databases.append(database)
+        return database
+
+    def _call_task(self, name: str, database: Database) -> None:
+        logger.info(f"Running task {name}")
+        if self._run_report is None:
+            self._tasks[name](database)
+            return
+        with self._run_report.stage(name):
+            self._tasks[name](database)
+
+    def _run_task(self, name: str) -> None:
+        self._call_task(name, self._get_worker_database())
+
+    def run(self) -> None:
+        """Run all tasks. If a task fails, no further tasks are started, those
+        already running are allowed to finish and the exception is reraised.
+
+        Returns:
+            None
+        """
+        remaining = self.get_order()
+        if self._workers <= 1:
+            for name in remaining:
+                self._call_task(name, self._database)
+            return
+        logger.info(f"Running {len(remaining)} tasks with {self._workers} workers")
+        done = set()
+        running = {}
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="theme"
+            ) as executor:
+                while remaining or running:
+                    ready = [
+                        name
+                        for name in remaining
+                        if all(
+                            dependency in done
+                            for dependency in self._dependencies[name]
+                        )
+                    ]
+                    for name in ready:
+                        remaining.remove(name)
+                        running[executor.submit(self._run_task, name)] = name
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        future.result()
+                        done.add(name)
+        finally:
+            for database in self._worker_databases:
+                database.get_session().close()
+            self._worker_databases = []
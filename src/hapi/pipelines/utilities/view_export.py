@@ -0,0 +1,171 @@
+"""Export the HAPI views of a PostgreSQL database."""
+
+import gzip
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from os import makedirs
+from os.path import exists, join
+from typing import Dict, Iterable, List, Optional
+
+from psycopg import sql
+from sqlalchemy import Connection, Engine, text
+
+logger = getLogger(__name__)
+
+_VIEWS_SQL = """SELECT table_name FROM information_schema.views
+WHERE table_schema = ANY (current_schemas(false)) ORDER BY table_name"""
+
+# Row count and sum of the first 60 bits of the md5 of each row as JSON (so
+# that column names count) which does not depend on the order of rows
+_CONTENT_HASH_SQL = """SELECT count(*),
+       coalesce(sum(('x' || left(md5(row_to_json(v)::text), 15))::bit(60)::bigint), 0)
+FROM {} AS v"""
+
+
+def get_view_names(connection: Connection) -> List[str]:
+    """Get the names of the views in the schemas of the search path.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+
+    Returns:
+        List[str]: Names of views
+    """
+    return list(connection.scalars(text(_VIEWS_SQL)))
+
+
+def get_content_hash(connection: Connection, view: str) -> str:
+    """Get a hash of the rows of a view computed in the database that does not
+    depend on the order of the rows.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        view (str): Name of view
+
+    Returns:
+        str: md5 hash of row count and sum of row hashes as hex
+    """
+    quoted_view = connection.dialect.identifier_preparer.quote(view)
+    count, total = connection.execute(text(_CONTENT_HASH_SQL.format(quoted_view))).one()
+    return hashlib.md5(f"{count}:{total}".encode()).hexdigest()
+
+
+def write_gzip_and_hash(chunks: Iterable[bytes], path: str) -> str:
+    """Write chunks of data to a gzip file computing the md5 hash of the
+    uncompressed data in the same pass. The gzip header has no timestamp so
+    that the same data always gives the same file.
+
+    Args:
+        chunks (Iterable[bytes]): Chunks of data
+        path (str): Path of gzip file
+
+    Returns:
+        str: md5 hash of uncompressed data as hex
+    """
+    md5 = hashlib.md5()
+    with (
+        open(path, "wb") as file,
+        gzip.GzipFile(
+            filename="", mode="wb", fileobj=file, compresslevel=6, mtime=0
+        ) as gzip_file,
+    ):
+        for chunk in chunks:
+            md5.update(chunk)
+            gzip_file.write(chunk)
+    return md5.hexdigest()
+
+
+def export_view_csv(engine: Engine, view: str, folder: str) -> str:
+    """Stream a view with COPY TO STDOUT in CSV format with header into
+    <view>.csv.gz in folder and write the md5 hash of the CSV to <view>.hash.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        view (str): Name of view
+        folder (str): Folder to write to
+
+    Returns:
+        str: md5 hash of CSV as hex
+    """
+    statement = sql.SQL(
+        "COPY (SELECT * FROM {}) TO STDOUT (FORMAT csv, DELIMITER ',', HEADER)"
+    ).format(sql.Identifier(view))
+    with engine.connect() as connection:
+        driver_connection = connection.connection.driver_connection
+        with driver_connection.cursor() as cursor, cursor.copy(statement) as copy:
+            content_hash = write_gzip_and_hash(copy, join(folder, f"{view}.csv.gz"))
+    with open(join(folder, f"{view}.hash"), "w") as file:
+        file.write(f"{content_hash}\n")
+    logger.info(f"Exported {view}")
+    return content_hash
+
+
+def export_view_csv_if_changed(
+    engine: Engine, view: str, folder: str, force: bool = False
+) -> Optional[str]:
+    """Export a view as export_view_csv does and write the content hash of the
+    view to <view>.content_hash in folder. Unless force is True, the view is
+    skipped if its content hash matches the one from the previous export and
+    the previous <view>.csv.gz and <view>.hash are still there.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        view (str): Name of view
+        folder (str): Folder to write to
+        force (bool): Whether to export even if unchanged. Defaults to False.
+
+    Returns:
+        Optional[str]: md5 hash of CSV as hex or None if the view is unchanged
+    """
+    with engine.connect() as connection:
+        content_hash = get_content_hash(connection, view)
+    content_hash_path = join(folder, f"{view}.content_hash")
+    if not force and all(
+        exists(join(folder, filename))
+        for filename in (f"{view}.csv.gz", f"{view}.hash", f"{view}.content_hash")
+    ):
+        with open(content_hash_path) as file:
+            if file.read().strip() == content_hash:
+                logger.info(f"{view} is unchanged")
+                return None
+    csv_hash = export_view_csv(engine, view, folder)
+    with open(content_hash_path, "w") as file:
+        file.write(f"{content_hash}\n")
+    return csv_hash
+
+
+def export_views(
+    engine: Engine, folder: str, workers: int = 4, incremental: bool = False
+) -> Dict[str, str]:
+    """Export every view in the schemas of the search path to folder as
+    gzipped CSV and hash files, several views at a time each over its own
+    connection. A hash of the content of each view computed in the database
+    is kept in a content hash file so that in incremental mode, only views
+    whose content changed since the previous export are exported.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        folder (str): Folder to write to
+        workers (int): Number of views exported concurrently. Defaults to 4.
+        incremental (bool): Whether to only export changed views. Defaults to False.
+
+    Returns:
+        Dict[str, str]: Name of each exported view to md5 hash of CSV
+    """
+    makedirs(folder, exist_ok=True)
+    with engine.connect() as connection:
+        views = get_view_names(connection)
+    with ThreadPoolExecutor(
+        max_workers=max(workers, 1), thread_name_prefix="export"
+    ) as executor:
+        futures = {
+            view: executor.submit(
+                export_view_csv_if_changed, engine, view, folder, not incremental
+            )
+            for view in views
+        }
+        csv_hashes = {view: future.result() for view, future in futures.items()}
+    return {
+        view: csv_hash for view, csv_hash in csv_hashes.items() if csv_hash is not None
+    }
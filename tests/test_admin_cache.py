@@ -0,0 +1,97 @@
+from os.path import join
+
+import pytest
+
+from hapi.pipelines.utilities import admin_cache
+from hapi.pipelines.utilities.admin_cache import (
+    CACHE_FILENAME,
+    get_admin_levels,
+    get_resource_versions,
+)
+
+
+class TestAdminCache:
+    @pytest.fixture(scope="function")
+    def configuration(self):
+        return {
+            "admin1": {"admin_name_mappings": {"CMR|West": "CM008"}},
+            "admin2": {"admin_name_replacements": {"SOM|dhexe": "middle"}},
+        }
+
+    @pytest.fixture(scope="function")
+    def get_paths(self):
+        folder = join("tests", "fixtures", "input")
+        paths = (
+            join(folder, "download-global-pcodes-adm-1-2.csv"),
+            join(folder, "download-global-pcode-lengths.csv"),
+        )
+        calls = []
+
+        def get_paths():
+            calls.append(paths)
+            return paths
+
+        get_paths.calls = calls
+        return get_paths
+
+    def test_get_admin_levels(self, configuration, get_paths, tmp_path, monkeypatch):
+        built = []
+        build_admin_levels = admin_cache.build_admin_levels
+
+        def count_builds(*args):
+            built.append(args)
+            return build_admin_levels(*args)
+
+        monkeypatch.setattr(admin_cache, "build_admin_levels", count_builds)
+        adminone, admintwo = get_admin_levels(configuration, get_paths)
+        assert len(built) == 1
+
+        cache_folder = str(tmp_path / "cache")
+        cached = get_admin_levels(configuration, get_paths, cache_folder)
+        assert len(built) == 2
+        cached = get_admin_levels(configuration, get_paths, cache_folder)
+        assert len(built) == 2
+        cachedone, cachedtwo = cached
+        assert cachedone.pcodes == adminone.pcodes
+        assert cachedone.admin_name_mappings == {"CMR|West": "CM008"}
+        assert cachedtwo.name_to_pcode == admintwo.name_to_pcode
+        assert cachedtwo.pcode_formats == admintwo.pcode_formats
+        assert cachedtwo.parent_admins == admintwo.parent_admins
+        assert cachedtwo.get_pcode("AFG", "AF0101") == ("AF0101", True)
+
+        configuration["admin2"]["admin_name_replacements"]["SOM|hoose"] = "lower"
+        get_admin_levels(configuration, get_paths, cache_folder)
+        assert len(built) == 3
+
+        with open(join(cache_folder, CACHE_FILENAME), "wb") as f:
+            f.write(b"corrupt")
+        get_admin_levels(configuration, get_paths, cache_folder)
+        assert len(built) == 4
+        get_admin_levels(configuration, get_paths, cache_folder)
+        assert len(built) == 4
+
+        versions = ["r1|2025-01-01T00:00:00", "r2|2025-01-01T00:00:00"]
+        get_paths.calls.clear()
+        get_admin_levels(configuration, get_paths, cache_folder, versions)
+        assert len(built) == 5
+        assert len(get_paths.calls) == 1
+        get_admin_levels(configuration, get_paths, cache_folder, versions)
+        assert len(built) == 5
+        assert len(get_paths.calls) == 1
+        versions[1] = "r2|2025-02-01T00:00:00"
+        get_admin_levels(configuration, get_paths, cache_folder, versions)
+        assert len(built) == 6
+
+    def test_get_resource_versions(self, monkeypatch):
+        resource_id = "f65bc260-4d8b-416f-ac07-f2433b4d5142"
+        url = f"https://data.humdata.org/dataset/cb963915-d7d1-4ffa-90dc-31277e24406f/resource/{resource_id}/download/global_pcodes_adm_1_2.csv"
+        resources = {resource_id: {"last_modified": "2025-01-01T00:00:00"}}
+
+        def read_from_hdx(identifier, configuration=None):
+            return resources.get(identifier)
+
+        monkeypatch.setattr(admin_cache.Resource, "read_from_hdx", read_from_hdx)
+        assert get_resource_versions((url,)) == [f"{resource_id}|2025-01-01T00:00:00"]
+        assert get_resource_versions(("https://data.org/global.csv",)) is None
+        resources.clear()
+        assert get_resource_versions((url,)) is None
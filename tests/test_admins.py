@@ -0,0 +1,92 @@
+import pytest
+from hdx.database import Database
+from sqlalchemy import create_engine
+
+from hapi.pipelines.database.admins import Admins
+
+
+class TestAdmins:
+    @pytest.fixture(scope="function")
+    def admins(self, mocker, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        configuration = {"commit_limit": 1000, "orphan_admin2s": {}}
+        with Database(engine=engine) as database:
+            admins = Admins(configuration, database, None, mocker.MagicMock())
+            admins.admin1_data = {"AF01": 1, "AFG-XXX": 2}
+            admins.admin2_data = {"AF0101": 11, "AF01-XXX": 12, "AFG-XXX-XXX": 13}
+            yield admins
+
+    @staticmethod
+    def get_rows():
+        rows = []
+        for location_code, admin1_code, admin2_code in (
+            ("AFG", "AF01", "AF0101"),
+            ("AFG", "AF01", "AF0199"),
+            ("AFG", "AF99", "AF9901"),
+            ("AFG", "", ""),
+            ("COD", "CD01", "CD0101"),
+        ):
+            rows.append(
+                {
+                    "location_code": location_code,
+                    "admin1_code": admin1_code,
+                    "admin2_code": admin2_code,
+                }
+            )
+        # Each row is seen several times as in a resource
+        return rows * 3
+
+    @staticmethod
+    def get_unique_calls(calls):
+        unique_calls = []
+        for call in calls:
+            if call not in unique_calls:
+                unique_calls.append(call)
+        return unique_calls
+
+    @pytest.mark.parametrize(
+        "admin_level, expected", [(0, [2, 2, 2, 2, None]), (1, [1, 1, 2, 2, None])]
+    )
+    def test_get_admin1_ref_from_row(self, admins, admin_level, expected):
+        rows = self.get_rows()
+        add_message = admins._error_handler.add_missing_value_message
+        uncached = [
+            admins._resolve_admin1_ref_from_row(row, "dataset", "pipeline", admin_level)
+            for row in rows
+        ]
+        uncached_calls = self.get_unique_calls(add_message.call_args_list)
+        add_message.reset_mock()
+        cached = [
+            admins.get_admin1_ref_from_row(row, "dataset", "pipeline", admin_level)
+            for row in rows
+        ]
+        assert cached == uncached
+        assert add_message.call_args_list == uncached_calls
+        assert (
+            cached[:5] == [1, 1, 2, 2, None] if admin_level == 1 else [2] * 4 + [None]
+        )
+
+    @pytest.mark.parametrize(
+        "admin_level, expected",
+        [
+            (0, [13, 13, 13, 13, None]),
+            (1, [12, 12, 13, 13, None]),
+            (2, [11, 12, 13, 13, None]),
+        ],
+    )
+    def test_get_admin2_ref_from_row(self, admins, admin_level, expected):
+        rows = self.get_rows()
+        add_message = admins._error_handler.add_missing_value_message
+        uncached = [
+            admins._resolve_admin2_ref_from_row(row, "dataset", "pipeline", admin_level)
+            for row in rows
+        ]
+        uncached_calls = self.get_unique_calls(add_message.call_args_list)
+        add_message.reset_mock()
+        cached = [
+            admins.get_admin2_ref_from_row(row, "dataset", "pipeline", admin_level)
+            for row in rows
+        ]
+        assert cached == uncached
+        assert add_message.call_args_list == uncached_calls
+        assert cached[:5] == expected
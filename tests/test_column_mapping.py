@@ -0,0 +1,57 @@
+import pytest
+
+from hapi.pipelines.database.column_mapping import ColumnMapping, ColumnTransform
+from hapi.pipelines.utilities.reader import Row
+
+
+class TestColumnMapping:
+    def test_column_transform(self):
+        transform = ColumnTransform(
+            (
+                ColumnMapping("gender"),
+                ColumnMapping("min_age", coercion=int),
+                ColumnMapping("category", default=""),
+                ColumnMapping("population", "pop", coercion=int, default=0),
+            )
+        )
+        assert transform.targets == ("gender", "min_age", "category", "population")
+        dict_rows = [
+            {"gender": "f", "min_age": "5", "category": None, "pop": "10"},
+            {"gender": "m", "min_age": None, "category": "IDP", "pop": ""},
+        ]
+        expected = [("f", 5, "", 10), ("m", None, "IDP", 0)]
+        assert transform(dict_rows) == expected
+
+        # Rows of two resources with different column orders
+        indices1 = {"pop": 0, "gender": 1, "min_age": 2, "category": 3}
+        indices2 = {"category": 0, "min_age": 1, "gender": 2, "pop": 3}
+        rows = [
+            Row(["10", "f", "5", None], indices1),
+            Row(["IDP", None, "m", ""], indices2),
+        ]
+        assert transform(rows) == expected
+        assert transform([]) == []
+
+        transform = ColumnTransform((ColumnMapping("events", coercion=int),))
+        assert transform([{"events": "3"}]) == [(3,)]
+
+    def test_required(self):
+        transform = ColumnTransform(
+            (
+                ColumnMapping("population", coercion=int, required=True),
+                ColumnMapping("gender", required=True),
+                ColumnMapping("min_age", coercion=int),
+            )
+        )
+        assert transform([{"population": "10", "gender": "f", "min_age": ""}]) == [
+            (10, "f", "")
+        ]
+        with pytest.raises(ValueError):
+            transform([{"population": "", "gender": "f", "min_age": "5"}])
+        with pytest.raises(TypeError):
+            transform([{"population": None, "gender": "f", "min_age": "5"}])
+        with pytest.raises(ValueError):
+            transform([{"population": "10", "gender": "", "min_age": "5"}])
+        indices = {"population": 0, "gender": 1, "min_age": 2}
+        with pytest.raises(ValueError):
+            transform([Row(["", "f", "5"], indices)])
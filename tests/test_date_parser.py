@@ -0,0 +1,30 @@
+import pytest
+from hdx.utilities.dateparse import parse_date
+
+from hapi.pipelines.utilities.date_parser import parse_iso_date
+
+
+class TestDateParser:
+    @pytest.mark.parametrize(
+        "string",
+        [
+            "2025-01-01",
+            "2024-02-29",
+            "2025-12-31",
+            "2025-01-01T00:00:00",
+            "2025-01-01 12:30:00",
+            "2025-01-01T10:00:00+02:00",
+            "01/02/2025",
+        ],
+    )
+    def test_parse_iso_date(self, string):
+        assert parse_iso_date(string) == parse_date(string)
+        assert parse_iso_date(string, max_time=True) == parse_date(
+            string, max_time=True
+        )
+
+    def test_parse_iso_date_invalid(self):
+        with pytest.raises(ValueError):
+            parse_iso_date("2025-02-30")
+        with pytest.raises(TypeError):
+            parse_iso_date(None)
@@ -0,0 +1,59 @@
+import pytest
+from hapi_schema.db_dataset import DBDataset
+from hapi_schema.db_resource import DBResource
+from hdx.database import Database
+from hdx.utilities.dateparse import parse_date
+from sqlalchemy import create_engine, select
+
+from hapi.pipelines.database.metadata import Metadata
+
+
+class Runner:
+    def __init__(self, resource_ids):
+        self._resource_ids = resource_ids
+
+    def get_hapi_metadata(self):
+        resources = {
+            resource_id: {
+                "name": f"Resource {resource_id}",
+                "format": "csv",
+                "update_date": parse_date("2024-01-01"),
+                "is_hxl": True,
+                "download_url": f"https://data.humdata.org/{resource_id}.csv",
+            }
+            for resource_id in self._resource_ids
+        }
+        return {
+            "d1": {
+                "hdx_stub": "dataset-1",
+                "title": "Dataset 1",
+                "hdx_provider_stub": "provider",
+                "hdx_provider_name": "Provider",
+                "resources": resources,
+            }
+        }
+
+
+class TestMetadata:
+    @pytest.fixture(scope="function")
+    def engine(self, tmp_path):
+        return create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+
+    def test_populate_again(self, engine):
+        with Database(engine=engine) as database:
+            metadata = Metadata(Runner(["r1"]), database, parse_date("2024-01-10"))
+            metadata.populate()
+        # A later run on the same database finds a new resource in the dataset
+        with Database(engine=engine, recreate_schema=False) as database:
+            today = parse_date("2024-02-10")
+            metadata = Metadata(Runner(["r1", "r2"]), database, today)
+            metadata.populate()
+            assert metadata.has_resource("r2")
+            session = database.get_session()
+            assert session.scalars(select(DBDataset.hdx_id)).all() == ["d1"]
+            results = session.execute(
+                select(DBResource.hdx_id, DBResource.hapi_updated_date).order_by(
+                    DBResource.hdx_id
+                )
+            )
+            assert results.all() == [("r1", today), ("r2", today)]
@@ -0,0 +1,54 @@
+import hashlib
+import json
+from decimal import Decimal
+
+import pytest
+
+from hapi.pipelines.utilities.parquet_export import _get_column, write_parquet
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+class TestParquetExport:
+    def test_write_parquet(self, tmp_path):
+        columns = [
+            _get_column("location_code", "varchar"),
+            _get_column("value", "numeric"),
+        ]
+        batches = [
+            [("AFG", 1), ("AFG", 2), ("COD", 3)],
+            [("COD", 4), (None, 5)],
+        ]
+        entry = write_parquet(batches, columns, str(tmp_path), "location_code")
+        assert entry["rows"] == 5
+        files = entry["files"]
+        assert {path: file["rows"] for path, file in files.items()} == {
+            "location_code=AFG/data.parquet": 2,
+            "location_code=COD/data.parquet": 2,
+            "location_code=__HIVE_DEFAULT_PARTITION__/data.parquet": 1,
+        }
+        path = tmp_path / "location_code=COD" / "data.parquet"
+        assert (
+            files["location_code=COD/data.parquet"]["sha256"]
+            == hashlib.sha256(path.read_bytes()).hexdigest()
+        )
+        table = pq.read_table(path)
+        assert table.column("value").to_pylist() == ["3", "4"]
+        json.dumps(entry)
+
+    def test_get_column_numeric(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        column = _get_column("value", "numeric", 12, 4)
+        assert column[1] == pa.decimal128(12, 4)
+        assert _get_column("value", "numeric", 50, 4)[1] == pa.string()
+        values = [(Decimal("0.1234"),), (Decimal("12345678.0001"),), (None,)]
+        write_parquet([values], [column], str(tmp_path))
+        table = pq.read_table(tmp_path / "data.parquet")
+        assert table.column("value").to_pylist() == [value for (value,) in values]
+
+    def test_write_parquet_unpartitioned(self, tmp_path):
+        columns = [_get_column("code", "text")]
+        entry = write_parquet([], columns, str(tmp_path))
+        assert entry["rows"] == 0
+        assert list(entry["files"]) == ["data.parquet"]
+        assert pq.read_table(tmp_path / "data.parquet").column_names == ["code"]
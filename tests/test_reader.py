@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from os.path import getsize, join
+
+import pytest
+from hdx.location.adminlevel import AdminLevel
+from hdx.scraper.framework.utilities.reader import Read
+from hdx.utilities.base_downloader import DownloadError
+from hdx.utilities.useragent import UserAgent
+
+from hapi.pipelines.utilities.reader import (
+    InstrumentedRead,
+    _get_rate_limiter,
+    download_file,
+    get_downloaded_path,
+    get_reader,
+    iterate_tabular_rows,
+)
+from hapi.pipelines.utilities.run_report import RunReport
+
+
+def test_get_reader(tmp_path):
+    UserAgent.set_global("test")
+    folder = join("tests", "fixtures", "input")
+    Read.create_readers(str(tmp_path), folder, str(tmp_path), False, True)
+    reader = Read.get_reader("hdx")
+    assert get_reader("hdx") is reader
+
+    def get_thread_readers(_):
+        return get_reader("hdx"), get_reader("hdx")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(get_thread_readers, range(2)))
+    rate_limiter = _get_rate_limiter(reader.downloader)
+    thread_readers = set()
+    for thread_reader, same_reader in results:
+        assert thread_reader is same_reader
+        assert thread_reader is not reader
+        assert thread_reader.downloader is not reader.downloader
+        assert thread_reader.downloader.session is reader.downloader.session
+        assert _get_rate_limiter(thread_reader.downloader) is rate_limiter
+        assert thread_reader.saved_dir == folder
+        assert thread_reader.use_saved is True
+        thread_readers.add(thread_reader)
+    assert len(thread_readers) == len({id(r.downloader) for r in thread_readers})
+
+
+def test_instrumented_read(tmp_path):
+    UserAgent.set_global("test")
+    folder = join("tests", "fixtures", "input")
+    InstrumentedRead.create_readers(str(tmp_path), folder, str(tmp_path), False, True)
+    reader = Read.get_reader("hdx")
+    assert isinstance(reader, InstrumentedRead)
+    run_report = RunReport()
+    with run_report.stage("download") as stage:
+        path = reader.download_file(AdminLevel.admin_url)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            thread_reader = executor.submit(get_reader, "hdx").result()
+        assert isinstance(thread_reader, InstrumentedRead)
+        thread_reader.download_file(AdminLevel.admin_url)
+    assert stage.counters["bytes_downloaded"] == 2 * getsize(path)
+    assert stage.counters["download_seconds"] >= 0
+
+
+def test_download_file(tmp_path):
+    UserAgent.set_global("test")
+    folder = join("tests", "fixtures", "input")
+    InstrumentedRead.create_readers(str(tmp_path), folder, str(tmp_path), False, True)
+    assert get_downloaded_path(AdminLevel.admin_url, "hdx") is None
+    run_report = RunReport()
+    with run_report.stage("download") as stage:
+        path = download_file(AdminLevel.admin_url, "hdx")
+        assert download_file(AdminLevel.admin_url, "hdx") == path
+    assert stage.counters["bytes_downloaded"] == getsize(path)
+    assert get_downloaded_path(AdminLevel.admin_url, "hdx") == path
+    # New readers do not reuse files downloaded with previous ones
+    InstrumentedRead.create_readers(str(tmp_path), folder, str(tmp_path), False, True)
+    assert get_downloaded_path(AdminLevel.admin_url, "hdx") is None
+
+
+def test_iterate_tabular_rows(tmp_path):
+    UserAgent.set_global("test")
+    folder = join("tests", "fixtures", "input")
+    Read.create_readers(str(tmp_path), folder, str(tmp_path), False, True)
+    urls = [
+        "https://feature.data-humdata-org.ahconu.org/dataset/5ebd91f3-91e0-4ebf-828f-7d93b26977c1/resource/b8737014-f5be-4c29-b45f-3ab8af41a55e/download/hdx_hapi_humanitarian_needs_global_2025.csv",
+        "https://feature.data-humdata-org.ahconu.org/dataset/5ebd91f3-91e0-4ebf-828f-7d93b26977c1/resource/0109c597-6fc4-45cc-b0f5-d06ac6d7a738/download/hdx_hapi_humanitarian_needs_global_2024.csv",
+    ]
+    expected = list(iterate_tabular_rows(urls, "hdx"))
+    assert len(expected) > 0
+    rows = list(iterate_tabular_rows(urls, "hdx", workers=2, chunk_size=100))
+    assert rows == expected
+    rows = list(iterate_tabular_rows(urls, "hdx", workers=2, dict_form=False))
+    assert len(rows) == len(expected)
+    for row, expected_row in zip(rows, expected):
+        assert list(row.keys()) == list(expected_row.keys())
+        assert row["location_code"] == expected_row["location_code"]
+        assert row.get("population") == expected_row["population"]
+        assert row.get("unknown", "") == ""
+        assert "sector_code" in row
+    row["location_code"] = "XYZ"
+    assert row["location_code"] == "XYZ"
+
+    bad_urls = [urls[0], "https://notfound.org/notfound.csv", urls[1]]
+    rows = iterate_tabular_rows(bad_urls, "hdx", workers=3, queue_size=1)
+    no_rows = 0
+    with pytest.raises(DownloadError):
+        for _ in rows:
+            no_rows += 1
+    assert no_rows == len(list(iterate_tabular_rows(urls[:1], "hdx")))
@@ -0,0 +1,92 @@
+from os import listdir, symlink
+from os.path import abspath, join
+
+import pytest
+from hapi_schema.db_conflict_event import DBConflictEvent
+from hapi_schema.db_operational_presence import DBOperationalPresence
+from hapi_schema.db_org import DBOrg
+from hapi_schema.db_refugees import DBRefugees
+from hdx.api.configuration import Configuration
+from hdx.api.utilities.hdx_error_handler import HDXErrorHandler
+from hdx.database import Database
+from hdx.scraper.framework.utilities.reader import Read
+from hdx.utilities.dateparse import parse_date
+from hdx.utilities.useragent import UserAgent
+from sqlalchemy import create_engine, select
+
+from hapi.pipelines.app import load_yamls
+from hapi.pipelines.app.__main__ import add_defaults
+from hapi.pipelines.app.pipelines import Pipelines
+
+
+class TestRowMode:
+    themes_to_run = {
+        "operational_presence": None,
+        "refugees": None,
+        "conflict_event": None,
+    }
+    hapi_tables = (DBOperationalPresence, DBOrg, DBRefugees, DBConflictEvent)
+
+    @pytest.fixture(scope="class")
+    def configuration(self):
+        UserAgent.set_global("test")
+        project_config_dict = load_yamls(["core.yaml"])
+        project_config_dict = add_defaults(project_config_dict)
+        Configuration._create(
+            hdx_read_only=True,
+            hdx_site="prod",
+            project_config_dict=project_config_dict,
+        )
+        return Configuration.read()
+
+    @pytest.fixture(scope="class")
+    def saved_folder(self, tmp_path_factory):
+        # The cut down theme files are read alongside the shared fixtures
+        saved_folder = tmp_path_factory.mktemp("saved")
+        for folder in (
+            join("tests", "fixtures", "input"),
+            join("tests", "fixtures", "row_mode"),
+        ):
+            for filename in listdir(folder):
+                symlink(abspath(join(folder, filename)), saved_folder / filename)
+        return str(saved_folder)
+
+    def get_rows(self, configuration, saved_folder, tmp_path, row_mode):
+        configuration["row_mode"] = row_mode
+        engine = create_engine(f"sqlite:///{tmp_path / f'{row_mode}.db'}")
+        with HDXErrorHandler() as error_handler:
+            with Database(engine=engine) as database:
+                Read.create_readers(
+                    str(tmp_path),
+                    saved_folder,
+                    str(tmp_path),
+                    False,
+                    True,
+                    today=parse_date("2023-10-11"),
+                )
+                pipelines = Pipelines(
+                    configuration,
+                    database,
+                    parse_date("2023-10-11"),
+                    themes_to_run=self.themes_to_run,
+                    error_handler=error_handler,
+                    use_live=False,
+                )
+                pipelines.run()
+                pipelines.output()
+                session = database.get_session()
+                rows = {
+                    hapi_table.__tablename__: sorted(
+                        session.execute(select(hapi_table.__table__)).all()
+                    )
+                    for hapi_table in self.hapi_tables
+                }
+        engine.dispose()
+        return rows
+
+    def test_row_modes(self, configuration, saved_folder, tmp_path):
+        expected = self.get_rows(configuration, saved_folder, tmp_path, "dict")
+        for rows in expected.values():
+            assert len(rows) > 0
+        rows = self.get_rows(configuration, saved_folder, tmp_path, "positional")
+        assert rows == expected
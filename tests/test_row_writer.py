@@ -0,0 +1,77 @@
+import pytest
+from hapi_schema.db_sector import DBSector
+from hdx.database import Database
+from sqlalchemy import create_engine, func, select
+
+from hapi.pipelines.database.row_writer import RowWriter
+
+
+class TestRowWriter:
+    @pytest.fixture(scope="function")
+    def database(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'test.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        with Database(engine=engine) as database:
+            yield database
+
+    @pytest.fixture(scope="function")
+    def rows(self):
+        return [{"code": f"S{i}", "name": f"Sector {i}"} for i in range(25)]
+
+    @pytest.mark.parametrize("chunk_size", [None, 1, 10, 100])
+    def test_row_writer(self, database, rows, chunk_size):
+        written = []
+
+        class TestWriter(RowWriter):
+            def _write(self, chunk):
+                written.append(len(chunk))
+                super()._write(chunk)
+
+        with TestWriter(database, DBSector, chunk_size) as row_writer:
+            for row in rows:
+                row_writer.add(row)
+        assert row_writer.no_rows == 25
+        assert sum(written) == 25
+        if chunk_size:
+            assert max(written) <= chunk_size
+        else:
+            assert written == [25]
+        session = database.get_session()
+        assert session.scalar(select(func.count(DBSector.code))) == 25
+
+    @pytest.mark.parametrize("chunk_size", [None, 10])
+    def test_row_writer_positional(self, database, rows, chunk_size):
+        written = []
+
+        class TestWriter(RowWriter):
+            def _write(self, chunk):
+                written.extend(chunk)
+                super()._write(chunk)
+
+        with TestWriter(database, DBSector, chunk_size, positional=True) as row_writer:
+            for row in rows:
+                row_writer.add({"name": row["name"], "code": row["code"]})
+        assert written[0] == ("S0", "Sector 0")
+        session = database.get_session()
+        results = session.execute(select(DBSector.code, DBSector.name))
+        assert sorted(results.all()) == sorted(tuple(row.values()) for row in rows)
+
+    def test_row_writer_error(self, database, rows):
+        with pytest.raises(Exception):
+            with RowWriter(database, DBSector, 10) as row_writer:
+                for row in rows + rows:
+                    row_writer.add(row)
+
+    def test_row_writer_encoded(self, database):
+        rows = [{"code": f"S{i}", "name": "".join(["Sect", "or"])} for i in range(5)]
+        assert rows[0]["name"] is not rows[1]["name"]
+        with RowWriter(
+            database, DBSector, None, encoded_columns=["name"]
+        ) as row_writer:
+            for row in rows:
+                row_writer.add(row)
+        assert all(row["name"] is rows[0]["name"] for row in rows)
+        session = database.get_session()
+        assert session.scalar(select(func.count(DBSector.code))) == 5
@@ -0,0 +1,52 @@
+import json
+from threading import Thread
+
+import pytest
+
+from hapi.pipelines.utilities.run_report import (
+    RunReport,
+    add_to_stage,
+    get_current_stage,
+)
+
+
+class TestRunReport:
+    def test_stages(self, tmp_path):
+        run_report = RunReport(trace_memory=True)
+        add_to_stage("rows_in", 1)
+        assert get_current_stage() is None
+        with run_report.stage("outer") as outer:
+            add_to_stage("rows_in", 10)
+            with run_report.stage("inner") as inner:
+                assert get_current_stage() is inner
+                add_to_stage("rows_out", 5)
+                add_to_stage("rows_out", 2, outer)
+
+            def worker():
+                assert get_current_stage() is None
+                add_to_stage("rows_out", 3, outer)
+
+            thread = Thread(target=worker)
+            thread.start()
+            thread.join()
+            assert get_current_stage() is outer
+        with pytest.raises(RuntimeError):
+            with run_report.stage("failed"):
+                raise RuntimeError("fail")
+
+        path = tmp_path / "run_report.json"
+        run_report.write(str(path))
+        with open(path) as f:
+            report = json.load(f)
+        assert report["peak_rss_bytes"] > 0
+        stages = {stage["name"]: stage for stage in report["stages"]}
+        assert list(stages) == ["inner", "outer", "failed"]
+        assert stages["outer"]["rows_in"] == 10
+        assert stages["outer"]["rows_out"] == 5
+        assert stages["outer"]["succeeded"] is True
+        assert stages["inner"]["rows_out"] == 5
+        assert stages["failed"]["succeeded"] is False
+        for stage in stages.values():
+            assert stage["wall_seconds"] >= 0
+            assert stage["thread_cpu_seconds"] >= 0
+            assert stage["peak_traced_bytes"] > 0
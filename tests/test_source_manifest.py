@@ -0,0 +1,89 @@
+from hapi_schema.db_funding import DBFunding
+from hdx.database import Database
+from sqlalchemy import func, select
+
+from hapi.pipelines.database.source_manifest import (
+    DBSourceManifest,
+    SourceManifest,
+    get_content_hash,
+)
+
+
+class FixedSourceManifest(SourceManifest):
+    def __init__(self, database, resources):
+        super().__init__(database, {})
+        self.resources = resources
+
+    def _get_resources(self, dataset_names):
+        return self.resources
+
+
+class TestSourceManifest:
+    def test_source_manifest(self, tmp_path, monkeypatch):
+        path = tmp_path / "funding.csv"
+        path.write_text("a,b\n1,2\n")
+        resources = {
+            "res1": {"id": "res1", "last_modified": "2025-01-01", "url": "url1"},
+        }
+
+        downloads = {}
+
+        def download_file(url, name):
+            downloads[url] = str(path)
+            return str(path)
+
+        module = "hapi.pipelines.database.source_manifest"
+        monkeypatch.setattr(f"{module}.download_file", download_file)
+        monkeypatch.setattr(
+            f"{module}.get_downloaded_path", lambda url, name: downloads.get(url)
+        )
+        with Database(dialect="sqlite", database=str(tmp_path / "test.db")) as db:
+            manifest = FixedSourceManifest(db, resources)
+            entries = manifest.get_changed_entries("funding", ["hdx-hapi-funding"])
+            assert entries == {"res1": ("2025-01-01", None)}
+            # Not downloaded when loaded so no hash is recorded
+            manifest.record(db, "funding", entries)
+            assert manifest.get_changed_entries("funding", []) is None
+            session = db.get_session()
+            row = session.scalar(select(DBSourceManifest))
+            assert row.content_hash is None
+
+            # New date, new content
+            resources["res1"]["last_modified"] = "2025-02-01"
+            content_hash = get_content_hash(str(path))
+            entries = manifest.get_changed_entries("funding", [])
+            assert entries == {"res1": ("2025-02-01", content_hash)}
+            manifest.record(db, "funding", entries)
+
+            # New date, same content so only the date is recorded
+            resources["res1"]["last_modified"] = "2025-03-01"
+            assert manifest.get_changed_entries("funding", []) is None
+            manifest = FixedSourceManifest(db, resources)
+            assert manifest.get_changed_entries("funding", []) is None
+            session.expire_all()
+            row = session.scalar(select(DBSourceManifest))
+            assert row.last_modified == "2025-03-01"
+            assert row.content_hash == content_hash
+
+            # Added resource
+            resources["res2"] = {
+                "id": "res2",
+                "last_modified": "2025-01-01",
+                "url": "url2",
+            }
+            entries = manifest.get_changed_entries("funding", [])
+            assert entries["res2"] == ("2025-01-01", None)
+            # Hash taken from the file downloaded to load the theme
+            download_file("url2", "hdx")
+            manifest.record(db, "funding", entries)
+            row = session.get(DBSourceManifest, ("funding", "res2"))
+            assert row.content_hash == content_hash
+
+            manifest.clear(db, "funding", [DBFunding])
+            count = select(func.count()).select_from(DBSourceManifest)
+            assert session.scalar(count) == 0
+            entries = manifest.get_changed_entries("funding", [])
+            assert entries == {
+                "res1": ("2025-03-01", None),
+                "res2": ("2025-01-01", None),
+            }
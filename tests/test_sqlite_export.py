@@ -0,0 +1,59 @@
+import sqlite3
+
+from hapi_schema.db_location import DBLocation
+from hapi_schema.db_sector import DBSector
+from hdx.database import Database
+from hdx.utilities.dateparse import parse_date
+from sqlalchemy import create_engine
+
+from hapi.pipelines.database.bulk_loader import insert_rows
+from hapi.pipelines.utilities.sqlite_export import export_sqlite
+
+
+class TestSQLiteExport:
+    def test_export_sqlite(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+        with Database(engine=engine) as database:
+            session = database.get_session()
+            insert_rows(
+                session,
+                DBSector.__table__,
+                [{"code": f"S{i}", "name": f"Sector {i}"} for i in range(5)],
+            )
+            insert_rows(
+                session,
+                DBLocation.__table__,
+                [
+                    {
+                        "code": "AFG",
+                        "name": "Afghanistan",
+                        "from_hapi": True,
+                        "reference_period_start": parse_date("2020-01-01"),
+                    }
+                ],
+            )
+            session.commit()
+        path = tmp_path / "export" / "hapi.db"
+        (tmp_path / "export").mkdir()
+        path.write_bytes(b"old")
+        row_counts = export_sqlite(engine, str(path), batch_size=2)
+        engine.dispose()
+        assert row_counts["sector"] == 5
+        assert row_counts["location"] == 1
+        assert not (tmp_path / "export" / "hapi.db.tmp").exists()
+        connection = sqlite3.connect(path)
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+        assert connection.execute("SELECT code FROM location_view").fetchall() == [
+            ("AFG",)
+        ]
+        indexes = {
+            name
+            for (name,) in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'location'"
+            )
+        }
+        assert "ix_location_code" in indexes
+        assert connection.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = 'sector'"
+        ).fetchone()
+        connection.close()
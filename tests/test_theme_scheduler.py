@@ -0,0 +1,87 @@
+from threading import Lock
+
+import pytest
+from hdx.database import Database
+
+from hapi.pipelines.utilities.theme_scheduler import ThemeScheduler
+
+
+class TestThemeScheduler:
+    @pytest.fixture(scope="function")
+    def database(self):
+        with Database(db_uri="sqlite://", dialect="sqlite") as database:
+            yield database
+
+    def test_get_order(self, database):
+        scheduler = ThemeScheduler(database)
+        scheduler.add_task("theme", lambda _: None, ("admins", "metadata"))
+        scheduler.add_task("admins", lambda _: None, ("locations",))
+        scheduler.add_task("metadata", lambda _: None)
+        scheduler.add_task("locations", lambda _: None)
+        assert scheduler.get_order() == ["metadata", "locations", "admins", "theme"]
+
+        with pytest.raises(ValueError):
+            scheduler.add_task("theme", lambda _: None)
+        scheduler.add_task("bad", lambda _: None, ("missing",))
+        with pytest.raises(ValueError):
+            scheduler.get_order()
+
+        scheduler = ThemeScheduler(database)
+        scheduler.add_task("a", lambda _: None, ("b",))
+        scheduler.add_task("b", lambda _: None, ("a",))
+        with pytest.raises(ValueError):
+            scheduler.get_order()
+
+    def test_run_serial(self, database):
+        ran = []
+        scheduler = ThemeScheduler(database)
+
+        def task(name):
+            def run(db):
+                assert db is database
+                ran.append(name)
+
+            return run
+
+        scheduler.add_task("food_prices", task("food_prices"), ("currency",))
+        scheduler.add_task("currency", task("currency"))
+        scheduler.add_task("funding", task("funding"))
+        scheduler.run()
+        assert ran == ["currency", "food_prices", "funding"]
+
+    def test_run_parallel(self, database):
+        ran = []
+        databases = set()
+        lock = Lock()
+        scheduler = ThemeScheduler(database, workers=4)
+
+        def task(name):
+            def run(db):
+                with lock:
+                    ran.append(name)
+                    databases.add(db)
+
+            return run
+
+        scheduler.add_task("locations", task("locations"))
+        scheduler.add_task("admins", task("admins"), ("locations",))
+        for theme in ("population", "idps", "rainfall", "conflict_event"):
+            scheduler.add_task(theme, task(theme), ("admins",))
+        scheduler.run()
+        assert ran[:2] == ["locations", "admins"]
+        assert sorted(ran[2:]) == ["conflict_event", "idps", "population", "rainfall"]
+        assert database not in databases
+        assert 1 <= len(databases) <= 4
+
+    def test_run_failure(self, database):
+        ran = []
+        scheduler = ThemeScheduler(database, workers=2)
+
+        def fail(_):
+            raise RuntimeError("fail")
+
+        scheduler.add_task("locations", fail)
+        scheduler.add_task("admins", lambda _: ran.append("admins"), ("locations",))
+        with pytest.raises(RuntimeError):
+            scheduler.run()
+        assert ran == []
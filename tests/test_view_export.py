@@ -0,0 +1,49 @@
+import gzip
+import hashlib
+
+from hapi.pipelines.utilities.view_export import (
+    export_view_csv_if_changed,
+    write_gzip_and_hash,
+)
+
+
+class TestViewExport:
+    def test_write_gzip_and_hash(self, tmp_path):
+        chunks = [b"code,name\n", b"AFG,Afghanistan\n", b"COD,Congo\n"]
+        path = tmp_path / "location_view.csv.gz"
+        content_hash = write_gzip_and_hash(chunks, str(path))
+        data = b"".join(chunks)
+        assert content_hash == hashlib.md5(data).hexdigest()
+        with gzip.open(path) as file:
+            assert file.read() == data
+        contents = path.read_bytes()
+        write_gzip_and_hash(chunks, str(path))
+        assert path.read_bytes() == contents
+
+    def test_export_view_csv_if_changed(self, mocker, tmp_path):
+        mocker.patch(
+            "hapi.pipelines.utilities.view_export.get_content_hash",
+            return_value="abc",
+        )
+
+        def export_view_csv(engine, view, folder):
+            (tmp_path / f"{view}.csv.gz").write_bytes(b"")
+            (tmp_path / f"{view}.hash").write_text("def\n")
+            return "def"
+
+        export = mocker.patch(
+            "hapi.pipelines.utilities.view_export.export_view_csv",
+            side_effect=export_view_csv,
+        )
+        engine = mocker.MagicMock()
+        folder = str(tmp_path)
+        assert export_view_csv_if_changed(engine, "sector_view", folder) == "def"
+        assert (tmp_path / "sector_view.content_hash").read_text() == "abc\n"
+        assert export_view_csv_if_changed(engine, "sector_view", folder) is None
+        assert (
+            export_view_csv_if_changed(engine, "sector_view", folder, force=True)
+            == "def"
+        )
+        (tmp_path / "sector_view.content_hash").write_text("xyz\n")
+        assert export_view_csv_if_changed(engine, "sector_view", folder) == "def"
+        assert export.call_count == 3